@@ -2,17 +2,29 @@
 """
 Device configuration and mapping module.
 """
-from typing import Dict, List, Optional, Any
-from core.detection import get_displays, get_audio_devices, find_display_by_keyword, find_audio_by_keyword
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple
 from utils.logger import logger
 from config.settings import load_config
 
+@lru_cache(maxsize=64)
+def _keyword_pattern(keywords: Tuple[str, ...]) -> re.Pattern:
+    """Compile a lowercase keyword tuple into a single alternation pattern."""
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
 class DeviceMapper:
     """
     Maps logical device names (like 'desk' or 'tv') to actual devices 
     found on the system using keywords and auto-detection.
     """
     
+    __slots__ = (
+        "config", "displays", "audio_devices", "mappings",
+        "_display_index", "_audio_index",
+        "_display_map", "_audio_output_map", "_audio_input_map",
+    )
+    
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         """
         Initialize with configuration.
@@ -20,16 +32,59 @@ class DeviceMapper:
         Args:
             config: Optional configuration dictionary. If None, loads from default location.
         """
-        self.config = config or load_config()
-        self.displays = get_displays()
-        self.audio_devices = get_audio_devices()
-        self.mappings = self._create_mappings()
+        self.config = config or load_config(readonly=True)
+        self.refresh()
     
     def refresh(self) -> None:
         """Refresh device information and mappings."""
+        # Imported here so that importing this module doesn't pull in the detection stack
+        from core.detection import get_displays, get_audio_devices
+        
         self.displays = get_displays()
         self.audio_devices = get_audio_devices()
+        self._build_indexes()
         self.mappings = self._create_mappings()
+        
+        # Direct references to the inner dicts for single-lookup access
+        self._display_map = self.mappings["displays"]
+        self._audio_output_map = self.mappings["audio"]["outputs"]
+        self._audio_input_map = self.mappings["audio"]["inputs"]
+    
+    def _build_indexes(self) -> None:
+        """Pre-lowercase the searchable text of every device for keyword matching."""
+        from core.detection import build_audio_search_index
+        
+        self._display_index = [(display, display["name"].lower()) for display in self.displays]
+        self._audio_index = build_audio_search_index(self.audio_devices)
+    
+    @staticmethod
+    def _find_by_keywords(keywords: List[str], index: List[Tuple[Dict, str]]) -> Optional[Dict]:
+        """
+        Find the device matching the earliest keyword in the list.
+        
+        Args:
+            keywords: Keywords in priority order
+            index: List of (device, lowercased searchable text) pairs
+            
+        Returns:
+            Matching device dict or None if no keyword matches
+        """
+        if not keywords:
+            return None
+        
+        keywords = tuple(keyword.lower() for keyword in keywords)
+        
+        # A single regex pass discards devices that match none of the keywords
+        pattern = _keyword_pattern(keywords)
+        candidates = [(device, text) for device, text in index if pattern.search(text)]
+        
+        # Keyword order is a priority order, so resolve it over the few candidates left
+        for keyword in keywords:
+            for device, text in candidates:
+                if keyword in text:
+                    return device
+        
+        return None
     
     def _create_mappings(self) -> Dict[str, Dict[str, str]]:
         """
@@ -49,28 +104,22 @@ class DeviceMapper:
         # Map displays
         display_keywords = self.config.get("displays", {}).get("keywords", {})
         for logical_name, keywords in display_keywords.items():
-            for keyword in keywords:
-                display = find_display_by_keyword(keyword, self.displays)
-                if display:
-                    mappings["displays"][logical_name] = display["name"]
-                    break
+            display = self._find_by_keywords(keywords, self._display_index)
+            if display:
+                mappings["displays"][logical_name] = display["name"]
         
         # Map audio devices
         audio_keywords = self.config.get("audio", {}).get("keywords", {})
         for logical_name, keywords in audio_keywords.items():
             # Try to find output devices first
-            for keyword in keywords:
-                device = find_audio_by_keyword(keyword, "outputs", self.audio_devices)
-                if device:
-                    mappings["audio"]["outputs"][logical_name] = device["name"]
-                    break
+            device = self._find_by_keywords(keywords, self._audio_index["outputs"])
+            if device:
+                mappings["audio"]["outputs"][logical_name] = device["name"]
             
             # Then try input devices
-            for keyword in keywords:
-                device = find_audio_by_keyword(keyword, "inputs", self.audio_devices)
-                if device:
-                    mappings["audio"]["inputs"][logical_name] = device["name"]
-                    break
+            device = self._find_by_keywords(keywords, self._audio_index["inputs"])
+            if device:
+                mappings["audio"]["inputs"][logical_name] = device["name"]
         
         return mappings
     
@@ -84,7 +133,7 @@ class DeviceMapper:
         Returns:
             Actual display name or None if not found
         """
-        return self.mappings["displays"].get(logical_name)
+        return self._display_map.get(logical_name)
     
     def get_audio_output(self, logical_name: str) -> Optional[str]:
         """
@@ -96,7 +145,7 @@ class DeviceMapper:
         Returns:
             Actual audio output device name or None if not found
         """
-        return self.mappings["audio"]["outputs"].get(logical_name)
+        return self._audio_output_map.get(logical_name)
     
     def get_audio_input(self, logical_name: str) -> Optional[str]:
         """
@@ -108,7 +157,7 @@ class DeviceMapper:
         Returns:
             Actual audio input device name or None if not found
         """
-        return self.mappings["audio"]["inputs"].get(logical_name)
+        return self._audio_input_map.get(logical_name)
     
     def update_mappings(self, mappings: Dict[str, Any]) -> None:
         """
@@ -118,13 +167,13 @@ class DeviceMapper:
             mappings: New mappings to set
         """
         if "displays" in mappings:
-            self.mappings["displays"].update(mappings["displays"])
+            self._display_map.update(mappings["displays"])
         
         if "audio" in mappings:
             if "outputs" in mappings["audio"]:
-                self.mappings["audio"]["outputs"].update(mappings["audio"]["outputs"])
+                self._audio_output_map.update(mappings["audio"]["outputs"])
             if "inputs" in mappings["audio"]:
-                self.mappings["audio"]["inputs"].update(mappings["audio"]["inputs"])
+                self._audio_input_map.update(mappings["audio"]["inputs"])
     
     def get_mappings(self) -> Dict[str, Any]:
         """
@@ -3,15 +3,18 @@
 Profile management for screen and audio configurations.
 """
 import os
-import json
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from utils.logger import logger
-from config.settings import CONFIG_DIR, load_config, save_config, update_config
+from config.settings import CONFIG_DIR, load_json_cached, seed_json_cache, atomic_write_json
 
 # Profiles directory
 PROFILES_DIR = os.path.join(CONFIG_DIR, "profiles")
 os.makedirs(PROFILES_DIR, exist_ok=True)
 
+# Parsed profiles keyed by path: (st_mtime_ns, st_size, data), least recently used first
+_PROFILE_CACHE: Dict[str, Tuple[int, int, Any]] = {}
+PROFILE_CACHE_SIZE = 32
+
 def get_profile_path(profile_name: str) -> str:
     """
     Get the file path for a profile.
@@ -33,26 +36,28 @@ def list_profiles() -> List[Dict[str, Any]]:
     """
     profiles = []
     
-    if not os.path.exists(PROFILES_DIR):
+    try:
+        with os.scandir(PROFILES_DIR) as it:
+            entries = [entry for entry in it if entry.name.endswith(".json") and entry.is_file()]
+    except FileNotFoundError:
         return profiles
     
-    for filename in os.listdir(PROFILES_DIR):
-        if filename.endswith(".json"):
-            file_path = os.path.join(PROFILES_DIR, filename)
-            try:
-                with open(file_path, 'r') as f:
-                    profile_data = json.load(f)
-                    
-                profile_name = filename.replace(".json", "").replace("_", " ")
-                profile_info = {
-                    "name": profile_name,
-                    "display_name": profile_data.get("name", profile_name),
-                    "description": profile_data.get("description", ""),
-                    "path": file_path
-                }
-                profiles.append(profile_info)
-            except Exception as e:
-                logger.error(f"Error reading profile {filename}: {e}")
+    for entry in entries:
+        try:
+            # Unchanged profiles are served from the parse cache
+            profile_data = load_json_cached(entry.path, _PROFILE_CACHE, readonly=True,
+                                            max_entries=PROFILE_CACHE_SIZE)
+            
+            profile_name = entry.name[:-len(".json")].replace("_", " ")
+            profile_info = {
+                "name": profile_name,
+                "display_name": profile_data.get("name", profile_name),
+                "description": profile_data.get("description", ""),
+                "path": entry.path
+            }
+            profiles.append(profile_info)
+        except Exception as e:
+            logger.error(f"Error reading profile {entry.name}: {e}")
     
     return profiles
 
@@ -68,13 +73,11 @@ def get_profile(profile_name: str) -> Optional[Dict[str, Any]]:
     """
     profile_path = get_profile_path(profile_name)
     
-    if not os.path.exists(profile_path):
+    try:
+        return load_json_cached(profile_path, _PROFILE_CACHE, max_entries=PROFILE_CACHE_SIZE)
+    except FileNotFoundError:
         logger.error(f"Profile {profile_name} not found")
         return None
-    
-    try:
-        with open(profile_path, 'r') as f:
-            return json.load(f)
     except Exception as e:
         logger.error(f"Error loading profile {profile_name}: {e}")
         return None
@@ -96,9 +99,10 @@ def create_profile(profile_name: str, config: Dict[str, Any]) -> bool:
     profile_data = config.copy()
     profile_data["name"] = profile_name
     
+    _PROFILE_CACHE.pop(profile_path, None)
     try:
-        with open(profile_path, 'w') as f:
-            json.dump(profile_data, f, indent=2)
+        atomic_write_json(profile_path, profile_data)
+        seed_json_cache(profile_path, profile_data, _PROFILE_CACHE, max_entries=PROFILE_CACHE_SIZE)
         logger.info(f"Profile {profile_name} saved to {profile_path}")
         return True
     except Exception as e:
@@ -117,14 +121,14 @@ def delete_profile(profile_name: str) -> bool:
     """
     profile_path = get_profile_path(profile_name)
     
-    if not os.path.exists(profile_path):
-        logger.error(f"Profile {profile_name} not found")
-        return False
-    
+    _PROFILE_CACHE.pop(profile_path, None)
     try:
         os.remove(profile_path)
         logger.info(f"Profile {profile_name} deleted")
         return True
+    except FileNotFoundError:
+        logger.error(f"Profile {profile_name} not found")
+        return False
     except Exception as e:
         logger.error(f"Error deleting profile {profile_name}: {e}")
         return False
@@ -156,28 +160,23 @@ def build_profile_from_detected_devices(profile_name: str, description: str = ""
         }
     }
     
-    # Find default/primary display
-    primary_display = None
-    for display in devices.get("displays", []):
-        if display.get("primary", False):
-            primary_display = display
-            break
+    displays = devices.get("displays", [])
     
-    # If no primary, use first available
-    if not primary_display and devices.get("displays"):
-        primary_display = devices.get("displays")[0]
+    # Find default/primary display; if no primary, use first available
+    primary_idx = next((i for i, display in enumerate(displays) if display.get("primary", False)),
+                       0 if displays else None)
     
     # Add primary display configuration
-    if primary_display:
+    if primary_idx is not None:
         profile["displays"]["primary"] = {
-            "name": primary_display["name"],
+            "name": displays[primary_idx]["name"],
             "enabled": True,
             "primary": True
         }
     
-    # Add other displays
-    for display in devices.get("displays", []):
-        if display != primary_display:
+    # Add other displays (compared by position, not by dict equality)
+    for i, display in enumerate(displays):
+        if i != primary_idx:
             profile["displays"][display["name"]] = {
                 "name": display["name"],
                 "enabled": False  # Default to disabled for non-primary displays
@@ -211,11 +210,11 @@ def apply_profile(profile_name: str) -> bool:
     if not profile:
         return False
     
-    from core.display import DisplayManager
-    from core.audio import AudioManager
+    from core.display import get_display_manager
+    from core.audio import get_audio_manager
     
     # Configure displays
-    display_mgr = DisplayManager()
+    display_mgr = get_display_manager()
     if "displays" in profile:
         # Create a copy of the display configuration, replacing any logical names with actual display names
         display_config = {}
@@ -235,24 +234,13 @@ def apply_profile(profile_name: str) -> bool:
             logger.error("Failed to configure displays")
             return False
     
-    # Configure audio
-    audio_mgr = AudioManager()
+    # Configure audio (output, input and volume in a single batch)
+    audio_mgr = get_audio_manager()
     if "audio" in profile:
-        # Set default output if specified
-        if profile["audio"].get("output"):
-            if not audio_mgr.set_default_sink(profile["audio"]["output"]):
-                logger.error(f"Failed to set default audio output to {profile['audio']['output']}")
-                return False
-        
-        # Set default input if specified
-        if profile["audio"].get("input"):
-            if not audio_mgr.set_default_source(profile["audio"]["input"]):
-                logger.error(f"Failed to set default audio input to {profile['audio']['input']}")
-                return False
-        
-        # Set volume if specified
-        if "volume" in profile["audio"] and profile["audio"].get("output"):
-            audio_mgr.set_volume(profile["audio"]["output"], profile["audio"]["volume"])
+        audio = profile["audio"]
+        if not audio_mgr.apply_audio_profile(audio.get("output"), audio.get("input"), audio.get("volume")):
+            logger.error("Failed to configure audio")
+            return False
     
     logger.info(f"Profile {profile_name} applied successfully")
     return True
@@ -3,17 +3,23 @@
 General settings for the screen and audio manager.
 """
 import os
-import json
-from typing import Dict, Any, Optional
+import copy
+import stat
+from typing import Dict, Any, Optional, Tuple
 from utils.logger import logger
+from utils import jsonio
 
 # Default configuration paths
 CONFIG_DIR = os.path.expanduser("~/.config/screen-audio-manager")
 DEFAULT_CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
 DEVICE_CACHE_FILE = os.path.join(CONFIG_DIR, "devices_cache.json")
+CACHE_DIR = os.path.join(CONFIG_DIR, "cache")
 
-# Ensure config directory exists
-os.makedirs(CONFIG_DIR, exist_ok=True)
+# Ensure config and cache directories exist
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+# Parsed JSON files keyed by path: (st_mtime_ns, st_size, data)
+_CONFIG_CACHE: Dict[str, Tuple[int, int, Any]] = {}
 
 # Default configuration
 DEFAULT_CONFIG = {
@@ -66,12 +72,142 @@ DEFAULT_CONFIG = {
     }
 }
 
-def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
+# Serialized snapshot of DEFAULT_CONFIG. It is written to disk as-is on first
+# run, and fresh copies are parsed from it so callers can never modify the
+# shared default by accident
+_DEFAULT_CONFIG_JSON = jsonio.dumps(DEFAULT_CONFIG)
+
+def get_default_config() -> Dict[str, Any]:
+    """
+    Get a fresh copy of the default configuration.
+    
+    Returns:
+        Default configuration dictionary that the caller may modify
+    """
+    return jsonio.loads(_DEFAULT_CONFIG_JSON)
+
+def load_json_cached(path: str, cache: Dict[str, Tuple[int, int, Any]],
+                     readonly: bool = False, max_entries: Optional[int] = None) -> Any:
+    """
+    Load a JSON file, reusing the parsed data while the file is unchanged.
+    
+    Args:
+        path: Path to the JSON file
+        cache: Cache dictionary mapping paths to (mtime_ns, size, data)
+        readonly: If True, return the cached object itself instead of a copy.
+                  Callers must not modify it.
+        max_entries: If set, keep at most this many entries in the cache,
+                     evicting the least recently used ones
+        
+    Returns:
+        The parsed data (a private copy unless readonly is set)
+    """
+    st = os.stat(path)
+    cached = cache.pop(path, None) if max_entries else cache.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        data = cached[2]
+        if max_entries:
+            # Re-insert so the entry becomes the most recently used
+            cache[path] = cached
+    else:
+        with open(path, 'rb') as f:
+            data = jsonio.loads(f.read())
+        _store_json_cache(path, (st.st_mtime_ns, st.st_size, data), cache, max_entries)
+    
+    return data if readonly else copy.deepcopy(data)
+
+def seed_json_cache(path: str, data: Any, cache: Dict[str, Tuple[int, int, Any]],
+                    max_entries: Optional[int] = None) -> None:
+    """
+    Record data that was just written to a JSON file in the cache.
+    
+    Args:
+        path: Path of the file that was written
+        data: Data that was written to the file
+        cache: Cache dictionary mapping paths to (mtime_ns, size, data)
+        max_entries: If set, keep at most this many entries in the cache
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        cache.pop(path, None)
+        return
+    _store_json_cache(path, (st.st_mtime_ns, st.st_size, copy.deepcopy(data)), cache, max_entries)
+
+def _store_json_cache(path: str, entry: Tuple[int, int, Any],
+                      cache: Dict[str, Tuple[int, int, Any]],
+                      max_entries: Optional[int]) -> None:
+    """Insert a cache entry, evicting the oldest entries beyond max_entries."""
+    cache.pop(path, None)
+    cache[path] = entry
+    if max_entries:
+        # Dicts keep insertion order, so the first keys are the least recently used
+        while len(cache) > max_entries:
+            del cache[next(iter(cache))]
+
+def atomic_write_json(path: str, data: Any) -> None:
+    """
+    Write data to a JSON file atomically.
+    
+    Args:
+        path: Path of the file to write
+        data: JSON-serializable data
+        
+    Raises:
+        OSError: If the file could not be written
+    """
+    atomic_write_bytes(path, jsonio.dumps(data))
+
+def atomic_write_bytes(path: str, payload: bytes) -> None:
+    """
+    Write a file atomically.
+    
+    The payload is written to a temporary file next to the target in a
+    single write and then moved over the target with os.replace, so
+    readers never observe a truncated file. A symlinked target is resolved
+    first so the link itself is kept. An existing file keeps its
+    permissions; a new one gets the usual mode for the umask.
+    
+    Args:
+        path: Path of the file to write
+        payload: File contents
+        
+    Raises:
+        OSError: If the file could not be written
+    """
+    path = os.path.realpath(path)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = None
+    
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        with os.fdopen(fd, 'wb') as f:
+            if mode is not None:
+                # Set explicitly, os.open's mode is subject to the umask
+                os.fchmod(f.fileno(), mode)
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def load_config(config_path: Optional[str] = None, readonly: bool = False) -> Dict[str, Any]:
     """
     Load configuration from file or create default if it doesn't exist.
     
+    The parsed file is cached in memory while its mtime and size are
+    unchanged, so repeated loads skip reading and parsing it.
+    
     Args:
         config_path: Path to config file. If None, uses default path.
+        readonly: If True, return the cached configuration itself instead
+                  of a copy. Callers must not modify it.
         
     Returns:
         Configuration dictionary
@@ -79,21 +215,19 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
     if config_path is None:
         config_path = DEFAULT_CONFIG_FILE
     
-    # If config file doesn't exist, create it with defaults
-    if not os.path.exists(config_path):
-        logger.info(f"Creating default configuration at {config_path}")
-        save_config(DEFAULT_CONFIG, config_path)
-        return DEFAULT_CONFIG
-    
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-            logger.debug(f"Loaded configuration from {config_path}")
-            return config
+        config = load_json_cached(config_path, _CONFIG_CACHE, readonly=readonly)
+        logger.debug(f"Loaded configuration from {config_path}")
+        return config
+    except FileNotFoundError:
+        # If config file doesn't exist, create it with defaults
+        logger.info(f"Creating default configuration at {config_path}")
+        save_default_config(config_path)
+        return get_default_config()
     except Exception as e:
         logger.error(f"Error loading config from {config_path}: {e}")
         logger.info("Using default configuration")
-        return DEFAULT_CONFIG
+        return get_default_config()
 
 def save_config(config: Dict[str, Any], config_path: Optional[str] = None) -> bool:
     """
@@ -109,15 +243,41 @@ def save_config(config: Dict[str, Any], config_path: Optional[str] = None) -> bo
     if config_path is None:
         config_path = DEFAULT_CONFIG_FILE
     
+    _CONFIG_CACHE.pop(config_path, None)
     try:
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
+        atomic_write_json(config_path, config)
+        seed_json_cache(config_path, config, _CONFIG_CACHE)
         logger.debug(f"Saved configuration to {config_path}")
         return True
     except Exception as e:
         logger.error(f"Error saving config to {config_path}: {e}")
         return False
 
+def save_default_config(config_path: Optional[str] = None) -> bool:
+    """
+    Write the default configuration to file.
+    
+    Uses the JSON serialized at import time, so no encoding work is done.
+    
+    Args:
+        config_path: Path to save to. If None, uses default path.
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    if config_path is None:
+        config_path = DEFAULT_CONFIG_FILE
+    
+    _CONFIG_CACHE.pop(config_path, None)
+    try:
+        atomic_write_bytes(config_path, _DEFAULT_CONFIG_JSON)
+        seed_json_cache(config_path, DEFAULT_CONFIG, _CONFIG_CACHE)
+        logger.debug(f"Saved default configuration to {config_path}")
+        return True
+    except Exception as e:
+        logger.error(f"Error saving config to {config_path}: {e}")
+        return False
+
 def update_config(updates: Dict[str, Any], config_path: Optional[str] = None) -> Dict[str, Any]:
     """
     Update specific parts of the configuration.
@@ -131,27 +291,34 @@ def update_config(updates: Dict[str, Any], config_path: Optional[str] = None) ->
     """
     config = load_config(config_path)
     
-    def recursive_update(target, source):
+    # Merge nested dictionaries iteratively instead of recursing per level,
+    # noting whether any value actually changes
+    changed = False
+    stack = [(config, updates)]
+    while stack:
+        target, source = stack.pop()
         for key, value in source.items():
             if isinstance(value, dict) and key in target and isinstance(target[key], dict):
-                recursive_update(target[key], value)
-            else:
+                stack.append((target[key], value))
+            elif key not in target or target[key] != value:
                 target[key] = value
+                changed = True
     
-    recursive_update(config, updates)
-    save_config(config, config_path)
+    # Skip the write when the updates didn't change anything
+    if changed:
+        save_config(config, config_path)
+    else:
+        logger.debug("Configuration unchanged, not saving")
     return config
 
 def get_cache_dir() -> str:
     """
-    Get the cache directory and ensure it exists.
+    Get the cache directory (created when this module is imported).
     
     Returns:
         Path to cache directory
     """
-    cache_dir = os.path.join(CONFIG_DIR, "cache")
-    os.makedirs(cache_dir, exist_ok=True)
-    return cache_dir
+    return CACHE_DIR
 
 def save_device_cache(devices: Dict[str, Any]) -> bool:
     """
@@ -163,9 +330,10 @@ def save_device_cache(devices: Dict[str, Any]) -> bool:
     Returns:
         True if successful, False otherwise
     """
+    _CONFIG_CACHE.pop(DEVICE_CACHE_FILE, None)
     try:
-        with open(DEVICE_CACHE_FILE, 'w') as f:
-            json.dump(devices, f, indent=2)
+        atomic_write_json(DEVICE_CACHE_FILE, devices)
+        seed_json_cache(DEVICE_CACHE_FILE, devices, _CONFIG_CACHE)
         return True
     except Exception as e:
         logger.error(f"Error saving device cache: {e}")
@@ -178,12 +346,10 @@ def load_device_cache() -> Optional[Dict[str, Any]]:
     Returns:
         Device information dictionary or None if not found/invalid
     """
-    if not os.path.exists(DEVICE_CACHE_FILE):
-        return None
-    
     try:
-        with open(DEVICE_CACHE_FILE, 'r') as f:
-            return json.load(f)
+        return load_json_cached(DEVICE_CACHE_FILE, _CONFIG_CACHE)
+    except FileNotFoundError:
+        return None
     except Exception as e:
         logger.error(f"Error loading device cache: {e}")
         return None
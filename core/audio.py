@@ -5,9 +5,32 @@ Audio device management module using PulseAudio or Pipewire.
 import re
 import json
 from typing import Dict, List, Optional
-from utils.shell import run_command
+from utils.shell import run_command, run_command_chain, run_commands_parallel
 from utils.logger import logger
-from core.detection import get_audio_devices, find_audio_by_keyword
+from core.detection import get_audio_devices, invalidate_audio_cache, build_audio_search_index
+
+# Detected audio system, shared by all AudioManager instances
+_AUDIO_SYSTEM: Optional[str] = None
+
+# AudioManager shared by the command and macro paths
+_AUDIO_MANAGER: Optional["AudioManager"] = None
+
+def get_audio_manager() -> "AudioManager":
+    """
+    Get the shared audio manager, creating it on first use.
+    
+    A reused manager refreshes its device list, which only re-enumerates
+    once the detection cache has expired.
+    
+    Returns:
+        Shared AudioManager instance
+    """
+    global _AUDIO_MANAGER
+    if _AUDIO_MANAGER is None:
+        _AUDIO_MANAGER = AudioManager()
+    else:
+        _AUDIO_MANAGER.refresh()
+    return _AUDIO_MANAGER
 
 class AudioManager:
     """
@@ -20,29 +43,63 @@ class AudioManager:
         self.refresh()
     
     def refresh(self) -> None:
-        """Refresh audio device information."""
+        """Refresh audio device information (may reuse a recent enumeration)."""
         self.devices = get_audio_devices()
+        self._search_index = build_audio_search_index(self.devices)
     
     def _detect_audio_system(self) -> str:
         """
         Detect whether the system is using PulseAudio or Pipewire.
         
+        The result is cached for the lifetime of the process.
+        
         Returns:
             'pulse' or 'pipewire'
         """
-        # Check for PulseAudio
-        result = run_command("pactl info")
-        if result.returncode == 0 and "PulseAudio" in result.stdout:
-            return 'pulse'
+        global _AUDIO_SYSTEM
+        if _AUDIO_SYSTEM is not None:
+            return _AUDIO_SYSTEM
         
-        # Check for Pipewire
-        result = run_command("wpctl status")
-        if result.returncode == 0:
-            return 'pipewire'
+        # Probe both systems concurrently; PulseAudio still takes precedence
+        results = run_commands_parallel([["pactl", "info"], ["wpctl", "status"]])
+        try:
+            # Check for PulseAudio
+            result = next(results)
+            if result.returncode == 0 and "PulseAudio" in result.stdout:
+                _AUDIO_SYSTEM = 'pulse'
+                return _AUDIO_SYSTEM
+            
+            # Check for Pipewire
+            result = next(results)
+            if result.returncode == 0:
+                _AUDIO_SYSTEM = 'pipewire'
+                return _AUDIO_SYSTEM
+        finally:
+            # Stops the wpctl probe if PulseAudio answered first
+            results.close()
         
         # Default to PulseAudio as fallback
         logger.warning("Could not determine audio system, defaulting to PulseAudio")
-        return 'pulse'
+        _AUDIO_SYSTEM = 'pulse'
+        return _AUDIO_SYSTEM
+    
+    def _set_default_cmd(self, device: Dict, device_type: str) -> List[str]:
+        """Build the command that makes a device the default sink or source."""
+        if self.system == 'pulse':
+            return ["pactl", f"set-default-{'sink' if device_type == 'outputs' else 'source'}", device['name']]
+        return ["wpctl", "set-default", device['id']]  # pipewire
+    
+    def _set_volume_cmd(self, device: Dict, volume: int, device_type: str) -> List[str]:
+        """Build the command that sets a device's volume (0-100)."""
+        # Ensure volume is within range
+        volume = max(0, min(100, volume))
+        
+        if self.system == 'pulse':
+            return ["pactl", f"set-{'sink' if device_type == 'outputs' else 'source'}-volume", device['name'], f"{volume}%"]
+        
+        # pipewire: convert to 0-1.5 range for wpctl
+        wpctl_vol = volume / 100 * 1.5
+        return ["wpctl", "set-volume", device['id'], f"{wpctl_vol:.2f}"]
     
     def get_device(self, keyword: str, device_type: str = 'outputs') -> Optional[Dict]:
         """
@@ -55,7 +112,12 @@ class AudioManager:
         Returns:
             Device dictionary or None if not found
         """
-        return find_audio_by_keyword(keyword, device_type, self.devices)
+        keyword = keyword.lower()
+        for device, text in self._search_index.get(device_type, []):
+            if keyword in text:
+                return device
+        
+        return None
     
     def set_default_sink(self, sink_name: str) -> bool:
         """
@@ -72,30 +134,69 @@ class AudioManager:
             logger.error(f"Audio output device '{sink_name}' not found")
             return False
         
-        if self.system == 'pulse':
-            cmd = f"pactl set-default-sink {sink['name']}"
-        else:  # pipewire
-            cmd = f"wpctl set-default {sink['id']}"
-        
-        result = run_command(cmd)
+        result = run_command(self._set_default_cmd(sink, 'outputs'))
         if result.returncode != 0:
             logger.error(f"Failed to set default sink: {result.stderr}")
             return False
         
         # Move all streams to the new sink (PulseAudio only)
         if self.system == 'pulse':
-            # Get all input streams (playback streams)
-            inputs_result = run_command("pactl list short sink-inputs")
-            if inputs_result.returncode == 0:
-                for line in inputs_result.stdout.splitlines():
-                    if line.strip():
-                        input_id = line.split()[0]
-                        move_cmd = f"pactl move-sink-input {input_id} {sink['name']}"
-                        run_command(move_cmd)
+            self._move_sink_inputs(sink)
         
-        self.refresh()
+        self._mark_default(sink, 'outputs')
         return True
     
+    def _mark_default(self, device: Dict, device_type: str) -> None:
+        """
+        Record a new default device without re-enumerating.
+        
+        Only the 'default' flags change when switching devices, so they are
+        updated in place. The shared detection cache is dropped so that other
+        users enumerate afresh.
+        
+        Args:
+            device: Device that became the default
+            device_type: 'outputs' or 'inputs'
+        """
+        for entry in self.devices.get(device_type, []):
+            entry['default'] = entry['name'] == device['name']
+        invalidate_audio_cache()
+    
+    def _move_sink_inputs(self, sink: Dict) -> None:
+        """
+        Move all playback streams to the given sink.
+        
+        Streams that already play on the sink are left alone, so nothing
+        beyond the listing runs when audio is idle or already switched.
+        
+        Args:
+            sink: Device dictionary of the sink to move the streams to
+        """
+        sink_name = sink['name']
+        
+        # Get all input streams (playback streams); the second column is the sink index
+        inputs_result = run_command(["pactl", "list", "short", "sink-inputs"])
+        if inputs_result.returncode != 0:
+            return
+        
+        input_ids = []
+        for line in inputs_result.stdout.splitlines():
+            fields = line.split()
+            if fields and (len(fields) < 2 or fields[1] != sink['id']):
+                input_ids.append(fields[0])
+        if not input_ids:
+            return
+        
+        # pactl has no script mode, so chain all moves into a single shell invocation
+        move_cmds = [["pactl", "move-sink-input", input_id, sink_name] for input_id in input_ids]
+        if run_command_chain(move_cmds).returncode == 0:
+            return
+        
+        # Fall back to moving the streams one at a time so one failure doesn't stop the rest
+        logger.debug("Batched stream move failed, moving streams individually")
+        for move_cmd in move_cmds:
+            run_command(move_cmd)
+    
     def set_default_source(self, source_name: str) -> bool:
         """
         Set the default audio input device.
@@ -111,17 +212,12 @@ class AudioManager:
             logger.error(f"Audio input device '{source_name}' not found")
             return False
         
-        if self.system == 'pulse':
-            cmd = f"pactl set-default-source {source['name']}"
-        else:  # pipewire
-            cmd = f"wpctl set-default {source['id']}"
-        
-        result = run_command(cmd)
+        result = run_command(self._set_default_cmd(source, 'inputs'))
         if result.returncode != 0:
             logger.error(f"Failed to set default source: {result.stderr}")
             return False
         
-        self.refresh()
+        self._mark_default(source, 'inputs')
         return True
     
     def set_volume(self, device_name: str, volume: int, device_type: str = 'outputs') -> bool:
@@ -141,23 +237,77 @@ class AudioManager:
             logger.error(f"Audio device '{device_name}' not found")
             return False
         
-        # Ensure volume is within range
-        volume = max(0, min(100, volume))
-        
-        if self.system == 'pulse':
-            cmd = f"pactl set-{'sink' if device_type == 'outputs' else 'source'}-volume {device['name']} {volume}%"
-        else:  # pipewire
-            # Convert to 0-1.5 range for wpctl
-            wpctl_vol = volume / 100 * 1.5
-            cmd = f"wpctl set-volume {device['id']} {wpctl_vol:.2f}"
-        
-        result = run_command(cmd)
+        result = run_command(self._set_volume_cmd(device, volume, device_type))
         if result.returncode != 0:
             logger.error(f"Failed to set volume: {result.stderr}")
             return False
         
         return True
     
+    def apply_audio_profile(self, sink_name: Optional[str] = None,
+                            source_name: Optional[str] = None,
+                            volume: Optional[int] = None) -> bool:
+        """
+        Set the default output, default input and output volume in one go.
+        
+        All devices are resolved against the current device list first and the
+        commands then run in a single shell invocation. If that fails, the
+        steps are retried one at a time so the failing one gets reported. A
+        failed volume change is only warned about once the defaults are set.
+        
+        Args:
+            sink_name: Name or keyword for the default output device
+            source_name: Name or keyword for the default input device
+            volume: Volume level (0-100) for the output device
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        sink = source = None
+        if sink_name:
+            sink = self.get_device(sink_name, 'outputs')
+            if not sink:
+                logger.error(f"Audio output device '{sink_name}' not found")
+                return False
+        if source_name:
+            source = self.get_device(source_name, 'inputs')
+            if not source:
+                logger.error(f"Audio input device '{source_name}' not found")
+                return False
+        
+        cmds = []
+        if sink:
+            cmds.append(self._set_default_cmd(sink, 'outputs'))
+        if source:
+            cmds.append(self._set_default_cmd(source, 'inputs'))
+        if sink and volume is not None:
+            cmds.append(self._set_volume_cmd(sink, volume, 'outputs'))
+        
+        if not cmds:
+            return True
+        
+        result = run_command_chain(cmds)
+        if result.returncode != 0:
+            logger.debug(f"Batched audio configuration failed, applying steps individually: {result.stderr}")
+            if sink and not self.set_default_sink(sink['name']):
+                return False
+            if source and not self.set_default_source(source['name']):
+                return False
+            if sink and volume is not None and not self.set_volume(sink['name'], volume):
+                # The defaults are in place, which is what matters most
+                logger.warning(f"Failed to set volume of {sink['name']} to {volume}%")
+            return True
+        
+        # Move all streams to the new sink (PulseAudio only)
+        if sink and self.system == 'pulse':
+            self._move_sink_inputs(sink)
+        
+        if sink:
+            self._mark_default(sink, 'outputs')
+        if source:
+            self._mark_default(source, 'inputs')
+        return True
+    
     def mute(self, device_name: str, mute: bool = True, device_type: str = 'outputs') -> bool:
         """
         Mute or unmute a device.
@@ -176,9 +326,9 @@ class AudioManager:
             return False
         
         if self.system == 'pulse':
-            cmd = f"pactl set-{'sink' if device_type == 'outputs' else 'source'}-mute {device['name']} {1 if mute else 0}"
+            cmd = ["pactl", f"set-{'sink' if device_type == 'outputs' else 'source'}-mute", device['name'], "1" if mute else "0"]
         else:  # pipewire
-            cmd = f"wpctl set-mute {device['id']} {1 if mute else 0}"
+            cmd = ["wpctl", "set-mute", device['id'], "1" if mute else "0"]
         
         result = run_command(cmd)
         if result.returncode != 0:
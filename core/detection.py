@@ -3,73 +3,218 @@
 Device detection module for automatically finding displays and audio devices.
 """
 import re
-import json
+import copy
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple, Any
-from utils.shell import run_command
+from utils.shell import run_command, run_commands_parallel
 from utils.logger import logger
-from config.settings import CONFIG_DIR, save_device_cache
+from utils import jsonio
+from config.settings import CONFIG_DIR, save_device_cache, atomic_write_json
 
-def get_displays() -> List[Dict]:
+# xrandr output header, e.g. "HDMI-1 connected primary 1920x1080+0+0 ..."
+_DISPLAY_RE = re.compile(r'^([a-zA-Z0-9-]+) (connected|disconnected)\b')
+# xrandr mode line for the active mode, e.g. "   1920x1080     60.00*+".
+# Mode names may carry a suffix ("1920x1080i", "1920x1080_60.00"), which is
+# not part of the resolution. Anchored and lazy so a line is scanned once.
+_RES_RE = re.compile(r'^\s+(\d+x\d+)\S*\s+[^\n]*?\*')
+# Geometry of an active output in its header, e.g. "1920x1080+0+0"
+_GEOMETRY_RE = re.compile(r'^\d+x\d+[+-]\d+[+-]\d+$')
+# wpctl section header, e.g. " ├─ Sinks:"
+_WP_HEADER_RE = re.compile(r'^\s*[├└]─\s*(.+?)\s*$')
+# wpctl object line, e.g. " │  *   47. Built-in Audio Analog Stereo  [vol: 0.40]",
+# capturing the default marker, the id and the name without the trailing [...]
+_WP_DEVICE_RE = re.compile(r'^\s*│\s*(\*)?\s*(\d+)\.\s+(.+?)(?:\s+\[[^\]]*\])?\s*$')
+
+# Kernel DRM connectors, used to tell when the display layout may have changed
+DRM_DIR = "/sys/class/drm"
+
+# Last display detection: (connector state, displays)
+_display_cache: Optional[Tuple[Tuple, List[Dict]]] = None
+
+# Seconds for which an audio device enumeration is reused
+AUDIO_CACHE_TTL = 2.0
+
+# Last audio device enumeration: (time.monotonic() timestamp, devices)
+_audio_cache: Optional[Tuple[float, Dict[str, List[Dict]]]] = None
+
+def invalidate_audio_cache() -> None:
+    """Discard the cached audio device enumeration."""
+    global _audio_cache
+    _audio_cache = None
+
+def invalidate_display_cache() -> None:
+    """Discard the cached display detection."""
+    global _display_cache
+    _display_cache = None
+
+def _drm_connector_state() -> Optional[Tuple[Tuple[str, str, str], ...]]:
+    """
+    Snapshot the connector state the kernel exposes in sysfs.
+    
+    Reading these small files is much cheaper than running xrandr, and
+    they change whenever a display is plugged in, unplugged, enabled or
+    disabled.
+    
+    Returns:
+        Sorted tuple of (connector, status, enabled) entries, or None if
+        the driver doesn't expose its connectors in sysfs
+    """
+    state = []
+    try:
+        with os.scandir(DRM_DIR) as it:
+            for entry in it:
+                # Connectors are named like 'card0-HDMI-A-1'
+                if '-' not in entry.name:
+                    continue
+                try:
+                    with open(os.path.join(entry.path, 'status')) as f:
+                        status = f.read().strip()
+                    with open(os.path.join(entry.path, 'enabled')) as f:
+                        enabled = f.read().strip()
+                except OSError:
+                    continue
+                state.append((entry.name, status, enabled))
+    except OSError:
+        return None
+    
+    return tuple(sorted(state)) if state else None
+
+def get_displays(use_cache: bool = True, probe: bool = False) -> List[Dict]:
     """
     Detect connected displays using xrandr.
     
+    The result is reused for as long as the kernel's connector state is
+    unchanged, so repeated lookups don't run xrandr each time. Callers
+    that change the display layout should call invalidate_display_cache().
+    Without connector information in sysfs, xrandr is always run.
+    
+    By default the X server's current state is read ('xrandr --current'),
+    which avoids re-probing the outputs for modes. Probing can take over a
+    second on some drivers and is only needed to pick up hardware changes
+    the server hasn't noticed.
+    
+    Args:
+        use_cache: If False, always run a fresh detection.
+        probe: If True, probe the hardware ('xrandr --query'); implies a
+               fresh detection.
+    
     Returns:
         List of dictionaries with display information.
     """
+    global _display_cache
+    
+    state = _drm_connector_state()
+    if use_cache and not probe and state is not None and _display_cache is not None:
+        cached_state, displays = _display_cache
+        if cached_state == state:
+            return copy.deepcopy(displays)
+    
+    displays = _detect_displays(probe)
+    _display_cache = (state, displays) if state is not None and displays else None
+    return copy.deepcopy(displays)
+
+def _detect_displays(probe: bool = False) -> List[Dict]:
+    """Detect displays with xrandr without consulting the cache."""
     displays = []
     
     # Get output from xrandr
-    result = run_command("xrandr --query")
+    result = run_command(["xrandr", "--query" if probe else "--current"], strip=False)
     if result.returncode != 0:
         logger.error(f"Failed to get display info: {result.stderr}")
         return displays
     
     # Parse displays
     current_display = None
-    for line in result.stdout.split('\n'):
+    for line in result.stdout.splitlines():
+        # Indented lines (modes, and property blocks in verbose output) belong
+        # to the last header; skip them once that display is fully known
+        if line[:1].isspace():
+            if current_display is None:
+                continue
+            
+            # Most mode lines have no '*' and are skipped without running the regex
+            rest = line.split(None, 1)[-1:]
+            if rest and '*' in rest[0]:
+                res_match = _RES_RE.match(line)
+                if res_match:
+                    current_display['current_resolution'] = res_match.group(1)
+                    # Only one mode is active per output
+                    current_display = None
+            continue
+        
         # Match display names like "HDMI-1 connected" or "DP-1 disconnected"
-        display_match = re.match(r'^([a-zA-Z0-9-]+) (connected|disconnected)', line)
+        display_match = _DISPLAY_RE.match(line)
         if display_match:
             name = display_match.group(1)
             status = display_match.group(2)
             
             if status == 'connected':
+                # The primary flag directly follows the status, then the
+                # geometry if the output is active:
+                # "DP-1 connected primary 1920x1080+0+0 ..."
+                tokens = line.split(None, 4)
+                primary = len(tokens) > 2 and tokens[2] == 'primary'
+                geometry = tokens[3 if primary else 2] if len(tokens) > (3 if primary else 2) else ""
                 current_display = {
                     'name': name,
                     'status': status,
                     'resolutions': [],
                     'current_resolution': None,
-                    'primary': '+primary' in line
+                    'primary': primary,
+                    'active': bool(_GEOMETRY_RE.match(geometry))
                 }
                 displays.append(current_display)
-        
-        # Parse resolution info
-        elif current_display and '*' in line:
-            res_match = re.search(r'(\d+x\d+).*\*', line)
-            if res_match:
-                current_display['current_resolution'] = res_match.group(1)
+            else:
+                # Don't attribute modes listed under a disconnected output
+                current_display = None
     
     return displays
 
-def get_audio_devices() -> Dict[str, List[Dict]]:
+def get_audio_devices(use_cache: bool = True) -> Dict[str, List[Dict]]:
     """
     Detect audio devices using PulseAudio or Pipewire.
     
+    Results are reused for AUDIO_CACHE_TTL seconds so that several
+    operations in quick succession only enumerate the devices once.
+    
+    Args:
+        use_cache: If False, always run a fresh enumeration.
+    
     Returns:
         Dictionary with 'inputs' and 'outputs' lists.
     """
+    global _audio_cache
+    
+    if use_cache and _audio_cache is not None:
+        timestamp, devices = _audio_cache
+        if time.monotonic() - timestamp < AUDIO_CACHE_TTL:
+            return copy.deepcopy(devices)
+    
+    devices = _detect_audio_devices()
+    _audio_cache = (time.monotonic(), devices)
+    return copy.deepcopy(devices)
+
+def _detect_audio_devices() -> Dict[str, List[Dict]]:
+    """Enumerate audio devices without consulting the cache."""
     devices = {
         'inputs': [],
         'outputs': []
     }
     
-    # Try PulseAudio first
-    result = run_command("pactl list short sinks")
+    # Try PulseAudio first, preferring its JSON output (pactl 16+)
+    json_devices = _detect_pulse_devices_json()
+    if json_devices is not None:
+        return json_devices
+    
+    # One full text listing covers both sinks and sources and doubles as
+    # the availability check
+    result = run_command(["pactl", "list"], strip=False)
     
     if result.returncode != 0:
         # Fall back to pipewire
-        result = run_command("wpctl status")
+        result = run_command(["wpctl", "status"], strip=False)
         if result.returncode != 0:
             logger.error("Failed to detect audio devices")
             return devices
@@ -78,58 +223,94 @@ def get_audio_devices() -> Dict[str, List[Dict]]:
         return _parse_pipewire_devices(result.stdout)
     
     # Parse PulseAudio output
-    return _parse_pulse_devices()
+    return _parse_pulse_devices(result.stdout)
 
-def _parse_pulse_devices() -> Dict[str, List[Dict]]:
-    """Parse PulseAudio devices."""
+def _detect_pulse_devices_json() -> Optional[Dict[str, List[Dict]]]:
+    """
+    Enumerate PulseAudio sinks and sources using pactl's JSON output.
+    
+    Returns:
+        Dictionary with 'inputs' and 'outputs' lists, or None if pactl
+        is missing or too old to support --format=json
+    """
+    commands = [
+        ["pactl", "--format=json", "list", "sinks"],
+        ["pactl", "--format=json", "list", "sources"],
+        ["pactl", "--format=json", "info"],
+    ]
+    
+    # pactl lists one object type per call, so run the three queries at once
+    results = run_commands_parallel(commands, strip=False)
+    try:
+        outputs = []
+        for result in results:
+            if result.returncode != 0:
+                return None
+            outputs.append(jsonio.loads(result.stdout))
+    except ValueError:
+        return None
+    finally:
+        results.close()
+    
+    sinks, sources, info = outputs
+    defaults = {
+        'outputs': info.get('default_sink_name'),
+        'inputs': info.get('default_source_name')
+    }
+    
+    devices = {}
+    for device_type, entries in (('outputs', sinks), ('inputs', sources)):
+        devices[device_type] = [
+            {
+                'id': str(entry.get('index', '')),
+                'name': entry.get('name') or '',
+                'description': entry.get('description') or '',
+                'default': entry.get('name') == defaults[device_type]
+            }
+            for entry in entries
+        ]
+    
+    return devices
+
+def _parse_pulse_devices(stdout: str) -> Dict[str, List[Dict]]:
+    """Parse PulseAudio sinks and sources from `pactl list` output."""
     devices = {
         'inputs': [],
         'outputs': []
     }
     
-    # Get sinks (outputs)
-    sinks_result = run_command("pactl list sinks")
-    if sinks_result.returncode == 0:
-        current_device = None
-        for line in sinks_result.stdout.split('\n'):
-            if line.startswith('Sink #'):
-                if current_device:
-                    devices['outputs'].append(current_device)
-                sink_id = line.split('#')[1].strip()
-                current_device = {'id': sink_id, 'name': '', 'description': '', 'default': False}
-            elif 'Name:' in line and current_device:
-                current_device['name'] = line.split('Name:')[1].strip()
-            elif 'Description:' in line and current_device:
-                current_device['description'] = line.split('Description:')[1].strip()
-        
-        if current_device:
-            devices['outputs'].append(current_device)
-    
-    # Get default sink
-    default_result = run_command("pactl info | grep 'Default Sink'")
-    if default_result.returncode == 0 and default_result.stdout:
-        default_sink = default_result.stdout.split(':')[1].strip()
-        for device in devices['outputs']:
-            if device['name'] == default_sink:
-                device['default'] = True
-    
-    # Similar for sources (inputs)
-    sources_result = run_command("pactl list sources")
-    if sources_result.returncode == 0:
-        current_device = None
-        for line in sources_result.stdout.split('\n'):
-            if line.startswith('Source #'):
-                if current_device:
-                    devices['inputs'].append(current_device)
-                source_id = line.split('#')[1].strip()
-                current_device = {'id': source_id, 'name': '', 'description': '', 'default': False}
-            elif 'Name:' in line and current_device:
-                current_device['name'] = line.split('Name:')[1].strip()
-            elif 'Description:' in line and current_device:
-                current_device['description'] = line.split('Description:')[1].strip()
-        
-        if current_device:
-            devices['inputs'].append(current_device)
+    # Every object starts with an unindented header such as 'Sink #47'.
+    # Only sinks and sources are collected; any other header (modules,
+    # sink inputs, cards, ...) ends the current device.
+    # Fields are looked up by their leading token, so nested property
+    # lines (e.g. 'device.description = "..."') never match.
+    section_types = {'Sink': 'outputs', 'Source': 'inputs'}
+    fields = {'Name:': 'name', 'Description:': 'description'}
+    current_device = None
+    for line in stdout.splitlines():
+        if line and not line[0].isspace():
+            current_device = None
+            kind, sep, device_id = line.partition(' #')
+            device_type = section_types.get(kind) if sep else None
+            if device_type:
+                current_device = {'id': device_id.strip(), 'name': '', 'description': '', 'default': False}
+                devices[device_type].append(current_device)
+        elif current_device is not None:
+            token, _, value = line.lstrip().partition(' ')
+            field = fields.get(token)
+            if field:
+                current_device[field] = value.strip()
+    
+    # Get default sink (filtered here rather than through a shell and grep)
+    default_result = run_command(["pactl", "info"])
+    if default_result.returncode == 0:
+        for line in default_result.stdout.splitlines():
+            if line.startswith('Default Sink:'):
+                default_sink = line.partition(':')[2].strip()
+                for device in devices['outputs']:
+                    if device['name'] == default_sink:
+                        device['default'] = True
+                break
     
     return devices
 
@@ -140,46 +321,61 @@ def _parse_pipewire_devices(stdout: str) -> Dict[str, List[Dict]]:
         'outputs': []
     }
     
+    # wpctl prints a tree per media class:
+    #   Audio
+    #    ├─ Sinks:
+    #    │  *   47. Built-in Audio Analog Stereo        [vol: 0.40]
+    # Only the Sinks and Sources of the Audio tree are collected; Video has
+    # its own Sources section.
+    section_types = {'Sinks:': 'outputs', 'Sources:': 'inputs'}
+    in_audio = False
     current_section = None
-    current_id = None
-    
-    for line in stdout.split('\n'):
-        if "Sinks:" in line:
-            current_section = 'outputs'
-        elif "Sources:" in line:
-            current_section = 'inputs'
-        elif current_section and line.strip() and '│' in line:
-            parts = line.split('│')
-            if len(parts) >= 2:
-                id_part = parts[0].strip()
-                name_part = parts[1].strip()
-                
-                if id_part and name_part:
-                    is_default = '*' in id_part
-                    id_clean = re.sub(r'[\s*]', '', id_part)
-                    
-                    device = {
-                        'id': id_clean,
-                        'name': name_part,
-                        'description': name_part,
-                        'default': is_default
-                    }
-                    
-                    devices[current_section].append(device)
+    
+    for line in stdout.splitlines():
+        if line and not line[0].isspace():
+            in_audio = line.strip() == 'Audio'
+            current_section = None
+            continue
+        
+        header = _WP_HEADER_RE.match(line)
+        if header:
+            current_section = section_types.get(header.group(1)) if in_audio else None
+            continue
+        
+        if current_section:
+            device_match = _WP_DEVICE_RE.match(line)
+            if device_match:
+                default, device_id, name = device_match.groups()
+                devices[current_section].append({
+                    'id': device_id,
+                    'name': name,
+                    'description': name,
+                    'default': bool(default)
+                })
     
     return devices
 
-def get_device_info() -> Dict[str, Any]:
+def get_device_info(probe: bool = False) -> Dict[str, Any]:
     """
     Get comprehensive information about all detected devices.
     
+    Display and audio detection are independent, so xrandr runs in a
+    worker thread while the audio devices are enumerated.
+    
+    Args:
+        probe: If True, probe the display hardware instead of reading the
+               X server's current state.
+    
     Returns:
         Dictionary with display and audio device information.
     """
-    return {
-        'displays': get_displays(),
-        'audio': get_audio_devices()
-    }
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        displays = executor.submit(get_displays, probe=probe)
+        audio = get_audio_devices()
+        return {
+            'displays': displays.result(),
+            'audio': audio
+        }
 
 def find_display_by_keyword(keyword: str, displays: Optional[List[Dict]] = None) -> Optional[Dict]:
     """
@@ -202,6 +398,27 @@ def find_display_by_keyword(keyword: str, displays: Optional[List[Dict]] = None)
     
     return None
 
+def build_audio_search_index(devices: Dict[str, List[Dict]]) -> Dict[str, List[Tuple[Dict, str]]]:
+    """
+    Pre-lowercase the searchable text of every audio device for keyword lookups.
+    
+    A device matches on its name or description. The two are joined with a
+    NUL so a keyword can't match across the boundary between them.
+    
+    Args:
+        devices: Dictionary with 'inputs' and 'outputs' lists
+        
+    Returns:
+        Dictionary with 'inputs' and 'outputs' lists of (device, text) pairs
+    """
+    return {
+        device_type: [
+            (device, f"{device['name']}\0{device.get('description') or ''}".lower())
+            for device in devices.get(device_type, [])
+        ]
+        for device_type in ("outputs", "inputs")
+    }
+
 def find_audio_by_keyword(keyword: str, device_type: str = 'outputs', 
                           devices: Optional[Dict] = None) -> Optional[Dict]:
     """
@@ -233,76 +450,84 @@ def save_detected_devices(filename: str = 'detected_devices.json') -> bool:
     """
     Detect all devices and save to a JSON file.
     
+    The display hardware is probed so the saved snapshot is complete.
+    
     Args:
         filename: Path to save the JSON data.
         
     Returns:
         True if successful, False otherwise
     """
-    devices = get_device_info()
+    devices = get_device_info(probe=True)
     
     # If not an absolute path, save to config directory
     if not os.path.isabs(filename):
         filename = os.path.join(CONFIG_DIR, filename)
     
     try:
-        with open(filename, 'w') as f:
-            json.dump(devices, f, indent=2)
+        atomic_write_json(filename, devices)
         logger.info(f"Device information saved to {filename}")
         return True
     except Exception as e:
         logger.error(f"Error saving device information: {e}")
         return False
 
-def get_available_displays() -> List[Dict[str, str]]:
+def get_available_displays(displays: Optional[List[Dict]] = None) -> List[Dict[str, str]]:
     """
     Get a simplified list of available displays.
     
+    Args:
+        displays: Optional list of displays to simplify. If None, will detect displays.
+        
     Returns:
         List of dictionaries with display information in a simple format.
     """
-    displays = get_displays()
+    if displays is None:
+        displays = get_displays()
     return [{"name": d["name"], "description": f"{d['name']} - {'Primary' if d.get('primary') else 'Secondary'}"} 
             for d in displays if d["status"] == "connected"]
 
-def get_available_audio_devices() -> Dict[str, List[Dict[str, str]]]:
+def get_available_audio_devices(audio_devices: Optional[Dict] = None) -> Dict[str, List[Dict[str, str]]]:
     """
     Get a simplified list of available audio devices.
     
+    Args:
+        audio_devices: Optional dict of devices to simplify. If None, will detect devices.
+        
     Returns:
         Dictionary with 'inputs' and 'outputs' lists in a simple format.
     """
-    audio_devices = get_audio_devices()
-    
-    simplified = {
-        "outputs": [],
-        "inputs": []
-    }
+    if audio_devices is None:
+        audio_devices = get_audio_devices()
     
-    for device_type in ["outputs", "inputs"]:
-        for device in audio_devices.get(device_type, []):
-            simplified[device_type].append({
+    return {
+        device_type: [
+            {
                 "name": device["name"],
                 "description": device.get("description", device["name"]),
                 "default": device.get("default", False)
-            })
-    
-    return simplified
+            }
+            for device in audio_devices.get(device_type, ())
+        ]
+        for device_type in ("outputs", "inputs")
+    }
 
 if __name__ == "__main__":
-    # When run directly, print detected devices
-    devices = get_device_info()
-    print(json.dumps(devices, indent=2))
+    # When run directly, print detected devices (detected only once)
+    devices = get_device_info(probe=True)
+    print(jsonio.dumps(devices).decode())
 
     # Also print a formatted version for easier reading
     print("\nDisplays:")
-    for display in get_available_displays():
+    for display in get_available_displays(devices['displays']):
         print(f"  {display['name']}: {display['description']}")
     
+    audio_devices = get_available_audio_devices(devices['audio'])
+    
     print("\nAudio outputs:")
-    for device in get_available_audio_devices()["outputs"]:
+    for device in audio_devices["outputs"]:
         print(f"  {device['name']}: {device['description']} {'(default)' if device['default'] else ''}")
     
     print("\nAudio inputs:")
-    for device in get_available_audio_devices()["inputs"]:
+    for device in audio_devices["inputs"]:
         print(f"  {device['name']}: {device['description']} {'(default)' if device['default'] else ''}")
@@ -5,7 +5,27 @@ Display management module for controlling monitors.
 from typing import Dict, List, Optional
 from utils.shell import run_command
 from utils.logger import logger
-from core.detection import get_displays, find_display_by_keyword
+from core.detection import get_displays, invalidate_display_cache
+
+# DisplayManager shared by the command and macro paths
+_DISPLAY_MANAGER: Optional["DisplayManager"] = None
+
+def get_display_manager() -> "DisplayManager":
+    """
+    Get the shared display manager, creating it on first use.
+    
+    A reused manager re-reads its displays through the detection cache the
+    next time they are needed, so it never works from an outdated layout.
+    
+    Returns:
+        Shared DisplayManager instance
+    """
+    global _DISPLAY_MANAGER
+    if _DISPLAY_MANAGER is None:
+        _DISPLAY_MANAGER = DisplayManager()
+    else:
+        _DISPLAY_MANAGER._dirty = True
+    return _DISPLAY_MANAGER
 
 class DisplayManager:
     """
@@ -14,11 +34,41 @@ class DisplayManager:
     
     def __init__(self):
         """Initialize the display manager."""
-        self.refresh()
+        self._displays: List[Dict] = []
+        self._by_name: Dict[str, Dict] = {}
+        self._by_name_lower: Dict[str, Dict] = {}
+        self._dirty = True
+        self._probe = False
+    
+    @property
+    def displays(self) -> List[Dict]:
+        """Detected displays, re-read from xrandr if they may be stale."""
+        self._ensure_fresh()
+        return self._displays
     
-    def refresh(self) -> None:
-        """Refresh the display information."""
-        self.displays = get_displays()
+    def refresh(self, probe: bool = False) -> None:
+        """
+        Mark the display information as stale.
+        
+        xrandr is queried again the next time the displays are needed, so
+        several changes in a row cost a single query.
+        
+        Args:
+            probe: If True, the next query probes the hardware instead of
+                   reading the X server's current state
+        """
+        invalidate_display_cache()
+        self._dirty = True
+        self._probe = self._probe or probe
+    
+    def _ensure_fresh(self) -> None:
+        """Re-read the display information if it was marked stale."""
+        if self._dirty:
+            self._displays = get_displays(probe=self._probe)
+            self._probe = False
+            self._by_name = {display['name']: display for display in self._displays}
+            self._by_name_lower = {display['name'].lower(): display for display in self._displays}
+            self._dirty = False
     
     def get_display(self, name: str) -> Optional[Dict]:
         """
@@ -30,13 +80,83 @@ class DisplayManager:
         Returns:
             Display dictionary or None if not found
         """
-        # First try exact match
-        for display in self.displays:
-            if display['name'] == name:
+        self._ensure_fresh()
+        
+        # First try exact match, then a case-insensitive one
+        display = self._by_name.get(name)
+        if display:
+            return display
+        
+        keyword = name.lower()
+        display = self._by_name_lower.get(keyword)
+        if display:
+            return display
+        
+        # Then try keyword search over the pre-lowercased names
+        for name_lower, display in self._by_name_lower.items():
+            if keyword in name_lower:
                 return display
         
-        # Then try keyword search
-        return find_display_by_keyword(name, self.displays)
+        return None
+    
+    @staticmethod
+    def _build_enable_args(display: Dict, resolution: Optional[str] = None,
+                           position: Optional[str] = None, ref_display: Optional[Dict] = None,
+                           primary: bool = False) -> List[str]:
+        """
+        Build the xrandr arguments that enable a display.
+        
+        Args:
+            display: Display to enable
+            resolution: Optional resolution (e.g., '1920x1080')
+            position: Optional position option (--right-of, --left-of, --above, --below)
+            ref_display: Display to position relative to
+            primary: Whether to make the display primary
+            
+        Returns:
+            List of xrandr arguments for this output
+        """
+        args = ['--output', display['name'], '--auto']
+        
+        if resolution:
+            args.extend(['--mode', resolution])
+        
+        if primary:
+            args.append('--primary')
+        
+        if (position and position != '--same-as' and ref_display
+                and ref_display['name'] != display['name']):
+            args.extend([position, ref_display['name']])
+        
+        return args
+    
+    @staticmethod
+    def _build_disable_args(display: Dict) -> List[str]:
+        """
+        Build the xrandr arguments that disable a display.
+        
+        Args:
+            display: Display to disable
+            
+        Returns:
+            List of xrandr arguments for this output
+        """
+        return ['--output', display['name'], '--off']
+    
+    def _layout_changed(self) -> None:
+        """
+        Record a layout change that was already applied to the display list.
+        
+        The local list is kept, but the shared detection cache is dropped so
+        other users query xrandr afresh.
+        """
+        invalidate_display_cache()
+    
+    def _mark_primary(self, display: Dict) -> None:
+        """Flip the primary flags in place after a display became primary."""
+        for entry in self._displays:
+            entry['primary'] = entry['name'] == display['name']
+        self._layout_changed()
     
     def enable_display(self, display_name: str, resolution: Optional[str] = None, 
                       position: str = '--right-of', relative_to: Optional[str] = None) -> bool:
@@ -57,33 +177,31 @@ class DisplayManager:
             logger.error(f"Display {display_name} not found")
             return False
         
-        # Build command
-        cmd = ['xrandr', '--output', display['name'], '--auto']
-        
-        # Add resolution if specified
-        if resolution:
-            cmd.extend(['--mode', resolution])
-        
-        # Add position if specified and we have more than one display
-        if len(self.displays) > 1 and position and position not in ['--same-as']:
+        # Find the reference display for positioning
+        ref_display = None
+        if len(self.displays) > 1 and position:
             if relative_to:
                 ref_display = self.get_display(relative_to)
-                if ref_display:
-                    cmd.extend([position, ref_display['name']])
             else:
                 # Use first connected display other than current one
                 for disp in self.displays:
                     if disp['status'] == 'connected' and disp['name'] != display['name']:
-                        cmd.extend([position, disp['name']])
+                        ref_display = disp
                         break
         
         # Execute command
-        result = run_command(' '.join(cmd))
+        result = run_command(['xrandr'] + self._build_enable_args(display, resolution, position, ref_display))
         if result.returncode != 0:
             logger.error(f"Failed to enable display: {result.stderr}")
             return False
         
-        self.refresh()
+        if resolution:
+            # The mode we asked for is known; with --auto xrandr picks it
+            display['current_resolution'] = resolution
+            display['active'] = True
+            self._layout_changed()
+        else:
+            self.refresh()
         return True
     
     def disable_display(self, display_name: str) -> bool:
@@ -101,14 +219,16 @@ class DisplayManager:
             logger.error(f"Display {display_name} not found")
             return False
         
-        cmd = f"xrandr --output {display['name']} --off"
-        result = run_command(cmd)
+        result = run_command(['xrandr'] + self._build_disable_args(display))
         
         if result.returncode != 0:
             logger.error(f"Failed to disable display: {result.stderr}")
             return False
         
-        self.refresh()
+        # A disabled output stays connected but has no active mode
+        display['current_resolution'] = None
+        display['active'] = False
+        self._layout_changed()
         return True
     
     def set_primary(self, display_name: str) -> bool:
@@ -127,8 +247,8 @@ class DisplayManager:
             return False
         
         # Make sure we run the primary command on an enabled display
-        cmd = f"xrandr --output {display['name']} --primary"
-        logger.debug(f"Executing primary display command: {cmd}")
+        cmd = ['xrandr', '--output', display['name'], '--primary']
+        logger.debug(f"Executing primary display command: {' '.join(cmd)}")
         result = run_command(cmd)
         
         if result.returncode != 0:
@@ -136,13 +256,121 @@ class DisplayManager:
             return False
         
         logger.debug(f"Set {display_name} as primary display successfully")
-        self.refresh()
+        self._mark_primary(display)
         return True
     
+    @staticmethod
+    def _is_applied(display: Dict, op: Dict) -> bool:
+        """
+        Check whether a display operation would change nothing.
+        
+        Positions are not tracked, so operations that place a display are
+        never considered applied. Whether an output is on comes from the
+        geometry in its xrandr header; if that is unknown, the operation is
+        never skipped.
+        
+        Args:
+            display: Current state of the display
+            op: Operation as passed to apply_batch
+            
+        Returns:
+            True if the display is already in the requested state
+        """
+        active = display.get('active')
+        
+        if op.get('enabled') is False:
+            return active is False
+        
+        if op.get('primary') is True and not display.get('primary'):
+            return False
+        
+        if op.get('enabled') is True:
+            resolution = op.get('resolution')
+            return (active is True and not op.get('position')
+                    and (not resolution or display.get('current_resolution') == resolution))
+        
+        return op.get('primary') is True
+    
+    def apply_batch(self, ops: List[Dict]) -> bool:
+        """
+        Apply several display changes with a single xrandr invocation.
+        
+        Each operation is a dict with the display 'name' and 'enabled'
+        (True or False). Operations that enable a display may also set
+        'primary', 'resolution', 'position' and 'relative_to'. An operation
+        without 'enabled' but with 'primary' only makes that display
+        primary. Displays not mentioned are left untouched, and operations
+        the current state already satisfies are skipped, so re-applying
+        the same layout runs no xrandr command at all.
+        
+        Args:
+            ops: List of display operations
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        success = True
+        disable_args = []
+        enable_args = []
+        
+        for op in ops:
+            display = self.get_display(op['name'])
+            if not display:
+                logger.error(f"Display {op['name']} not found")
+                success = False
+                continue
+            
+            if self._is_applied(display, op):
+                logger.debug(f"Display {display['name']} is already in the requested state")
+                continue
+            
+            if op.get('enabled') is False:
+                logger.debug(f"Disabling display: {display['name']}")
+                disable_args.extend(self._build_disable_args(display))
+            elif op.get('enabled') is True:
+                logger.debug(f"Enabling display: {display['name']}")
+                relative_to = op.get('relative_to')
+                enable_args.extend(self._build_enable_args(
+                    display, op.get('resolution'), op.get('position'),
+                    self.get_display(relative_to) if relative_to else None,
+                    primary=op.get('primary') is True))
+            elif op.get('primary') is True:
+                logger.debug(f"Setting primary display: {display['name']}")
+                enable_args.extend(['--output', display['name'], '--primary'])
+        
+        if not disable_args and not enable_args:
+            return success
+        
+        cmd = ['xrandr'] + disable_args + enable_args
+        logger.debug(f"Executing display configuration command: {' '.join(cmd)}")
+        result = run_command(cmd)
+        
+        # The server can't always drive the new outputs while the old ones
+        # still hold their CRTCs; free them first and then enable the rest
+        if (result.returncode != 0 and disable_args and enable_args
+                and 'cannot find crtc' in result.stderr.lower()):
+            logger.debug("Not enough CRTCs for a single transition, applying the layout in two steps")
+            result = run_command(['xrandr'] + disable_args)
+            if result.returncode == 0:
+                result = run_command(['xrandr'] + enable_args)
+        
+        self.refresh()
+        
+        if result.returncode != 0:
+            logger.error(f"Failed to configure displays: {result.stderr}")
+            return False
+        
+        return success
+    
     def configure_displays(self, config: Dict) -> bool:
         """
         Configure displays according to a configuration dict.
         
+        The whole layout is applied with a single xrandr invocation: every
+        connected display that is not enabled in the configuration is turned
+        off, the primary display is enabled first and the remaining displays
+        are positioned relative to it.
+        
         Args:
             config: Dictionary with display configurations
             
@@ -156,92 +384,90 @@ class DisplayManager:
         # Find which display should be primary and get a list of all enabled displays
         primary_display = None
         enabled_displays = []
-        disabled_displays = []
         
         for display_name, settings in config.items():
             if settings.get('enabled') is True:
                 enabled_displays.append(display_name)
                 if settings.get('primary') is True:
                     primary_display = display_name
-            else:
-                disabled_displays.append(display_name)
-        
-        # First turn off all displays
-        logger.debug("Disabling all displays first to reset configuration")
-        self.refresh() # Make sure we have the latest display info
-        for display in self.displays:
-            display_name = display['name']
-            logger.debug(f"Disabling display: {display_name}")
-            self.disable_display(display_name)
         
-        # Then enable the primary display first (if set)
+        # Enable the primary display first (if set)
         if primary_display:
-            display_settings = config[primary_display]
-            logger.debug(f"Enabling primary display first: {primary_display}")
-            
-            resolution = display_settings.get('resolution')
-            
-            # For primary, don't set position relative to anything since it's first
-            cmd = f"xrandr --output {display_settings['name']} --auto --primary"
-            if resolution:
-                cmd += f" --mode {resolution}"
-                
-            logger.debug(f"Executing primary display command: {cmd}")
-            result = run_command(cmd)
-            
-            if result.returncode != 0:
-                logger.error(f"Failed to enable primary display: {result.stderr}")
-                success = False
-            else:
-                logger.debug(f"Successfully enabled primary display: {primary_display}")
-                # Remove primary from the list of displays to enable
-                enabled_displays.remove(primary_display)
+            enabled_displays.remove(primary_display)
+            enabled_displays.insert(0, primary_display)
         
-        # Then enable other displays relative to the primary or the first one enabled
-        reference_display = primary_display if primary_display else None
+        self.refresh() # Make sure we have the latest display info
+        
+        # Enable all displays, relative to the primary or the first one enabled
+        ops = []
+        enabled_outputs = set()
+        primary_output = None
+        reference_display = primary_display
         
         for display_name in enabled_displays:
+            settings = config[display_name]
+            display = self.get_display(settings.get('name', display_name))
+            if not display:
+                logger.error(f"Display {display_name} not found")
+                success = False
+                continue
+            
             if not reference_display:
                 reference_display = display_name
-                
-            settings = config[display_name]
-            logger.debug(f"Enabling secondary display: {display_name}")
             
-            resolution = settings.get('resolution')
-            position = settings.get('position', '--right-of')
-            relative_to = settings.get('relative_to', reference_display)
+            op = {'name': display['name'], 'enabled': True, 'resolution': settings.get('resolution')}
+            if display_name == primary_display:
+                # For primary, don't set position relative to anything since it's first
+                primary_output = display['name']
+                op['primary'] = True
+            else:
+                relative_to = settings.get('relative_to', reference_display)
+                op['position'] = settings.get('position', '--right-of')
+                op['relative_to'] = config.get(relative_to, {}).get('name', relative_to)
             
-            # Enable this display
-            if not self.enable_display(display_name, resolution, position, relative_to):
-                success = False
+            ops.append(op)
+            enabled_outputs.add(display['name'])
+        
+        # Turn off every other display in the same invocation
+        disable_ops = [{'name': display['name'], 'enabled': False}
+                       for display in self.displays if display['name'] not in enabled_outputs]
+        
+        if not self.apply_batch(disable_ops + ops):
+            success = False
         
         # Verify that the primary setting was applied
-        if primary_display and success:
-            self.refresh()  # Refresh display list
+        self._ensure_fresh()
+        if primary_output and success:
             primary_set = False
             
             for display in self.displays:
-                if display['name'] == config[primary_display]['name'] and display.get('primary'):
+                if display['name'] == primary_output and display.get('primary'):
                     primary_set = True
                     break
                     
             if not primary_set:
                 # Try one more time to set the primary display
-                logger.debug(f"Trying one more time to set {primary_display} as primary")
-                if not self.set_primary(primary_display):
-                    logger.warning(f"Failed to set {primary_display} as primary display")
+                logger.debug(f"Trying one more time to set {primary_output} as primary")
+                if not self.set_primary(primary_output):
+                    logger.warning(f"Failed to set {primary_output} as primary display")
                     success = False
         
         return success
     
-    def get_display_info(self) -> Dict:
+    def get_display_info(self, probe: bool = False) -> Dict:
         """
         Get information about all displays.
         
+        The X server's current state is read, which never probes the
+        display hardware unless asked to.
+        
+        Args:
+            probe: If True, probe the hardware for outputs and modes
+            
         Returns:
             Dictionary with display information
         """
-        self.refresh()
+        self.refresh(probe)
         return {"displays": self.displays}
 
     def _enable_display_as_primary(self, display_name: str, resolution: str = None, 
@@ -263,19 +489,16 @@ class DisplayManager:
             logger.error(f"Display {display_name} not found")
             return False
             
-        # Build xrandr command
-        cmd = f"xrandr --output {display['name']} --auto --primary"
-        
-        if resolution:
-            cmd += f" --mode {resolution}"
-            
+        # Check if the relative display exists
+        relative_display = None
         if position and relative_to:
-            # Check if the relative display exists
             relative_display = self.get_display(relative_to)
-            if relative_display:
-                cmd += f" {position} {relative_display['name']}"
+        
+        # Build xrandr command
+        cmd = ['xrandr'] + self._build_enable_args(display, resolution, position,
+                                                   relative_display, primary=True)
                 
-        logger.debug(f"Executing enable as primary command: {cmd}")
+        logger.debug(f"Executing enable as primary command: {' '.join(cmd)}")
         result = run_command(cmd)
         
         if result.returncode != 0:
@@ -283,5 +506,10 @@ class DisplayManager:
             return False
             
         logger.debug(f"Enabled {display_name} as primary display successfully")
-        self.refresh()
+        if resolution:
+            display['current_resolution'] = resolution
+            display['active'] = True
+            self._mark_primary(display)
+        else:
+            self.refresh()
         return True
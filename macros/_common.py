@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Shared setup for the display/audio macros.
+"""
+import os
+from typing import Any, Dict, Optional, Tuple
+from core.display import DisplayManager, get_display_manager
+from core.audio import AudioManager, get_audio_manager
+from config.devices import DeviceMapper
+from config.settings import DEFAULT_CONFIG_FILE, load_config
+
+# Configuration and mapper from the last macro run, keyed by the config
+# file's (st_mtime_ns, st_size)
+_CONTEXT: Optional[Tuple[Tuple[int, int], Dict[str, Any], DeviceMapper]] = None
+
+def _config_key() -> Optional[Tuple[int, int]]:
+    """Get the (mtime_ns, size) of the config file, or None if it is missing."""
+    try:
+        st = os.stat(DEFAULT_CONFIG_FILE)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def get_context() -> Tuple[Dict[str, Any], DeviceMapper, DisplayManager, AudioManager]:
+    """
+    Get the configuration, device mapper and managers for a macro run.
+    
+    The configuration and mapper are reused while the config file is
+    unchanged; the mapper only re-reads the (cached) device detection.
+    The managers are shared with the rest of the process and re-check
+    device state when handed out.
+    
+    Returns:
+        Tuple of (config, mapper, display manager, audio manager)
+    """
+    global _CONTEXT
+    
+    key = _config_key()
+    if _CONTEXT is not None and key is not None and _CONTEXT[0] == key:
+        config, mapper = _CONTEXT[1], _CONTEXT[2]
+        mapper.refresh()
+    else:
+        config = load_config(readonly=True)
+        mapper = DeviceMapper(config)
+        # load_config may have just created the file
+        key = _config_key()
+        _CONTEXT = (key, config, mapper) if key is not None else None
+    
+    return config, mapper, get_display_manager(), get_audio_manager()
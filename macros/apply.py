@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Data-driven macro applier shared by all display/audio modes.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from macros._common import get_context
+from utils.logger import logger
+
+# Human-readable names used in log messages
+MODE_LABELS = {
+    "desk_mode": "desk mode",
+    "tv_mode": "TV mode",
+    "dual_mode": "dual mode"
+}
+
+def apply_mode(mode_name: str) -> bool:
+    """
+    Apply a macro from the 'macros' section of the configuration:
+    - Enable or disable the configured displays
+    - Position displays relative to each other and set the primary one
+    - Switch audio to the configured output and set its volume
+    
+    All display changes are applied with a single xrandr call, while the
+    audio changes run alongside it in a second thread.
+    
+    Args:
+        mode_name: Macro key in the configuration (e.g. 'desk_mode')
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    label = MODE_LABELS.get(mode_name, mode_name.replace("_", " "))
+    logger.info(f"Applying {label}")
+    
+    try:
+        # Load configuration, mappings and managers
+        config, mapper, display_manager, audio_manager = get_context()
+        
+        # Get macro configuration
+        macro_config = config.get("macros", {}).get(mode_name, {})
+        if not macro_config:
+            logger.error(f"{label[:1].upper()}{label[1:]} configuration not found")
+            return False
+        
+        def _do_displays() -> bool:
+            # Resolve every display to its physical name and settings up front
+            resolved = []
+            physical_names = {}
+            for logical_name, settings in macro_config.get("displays", {}).items():
+                enabled = settings.get("enabled")
+                primary = settings.get("primary") is True
+                if enabled not in (True, False) and not primary:
+                    continue
+                
+                physical_name = mapper.get_display(logical_name)
+                if not physical_name:
+                    logger.warning(f"Display '{logical_name}' not found in mappings")
+                    continue
+                
+                physical_names[logical_name] = physical_name
+                resolved.append((physical_name, enabled, primary,
+                                 settings.get("position"), settings.get("relative_to")))
+            
+            # Turn the resolved rows into xrandr operations
+            display_ops = []
+            for physical_name, enabled, primary, position, relative_to in resolved:
+                if enabled is False:
+                    display_ops.append({"name": physical_name, "enabled": False})
+                    continue
+                
+                # Displays that are only marked primary keep their current state
+                op = {"name": physical_name, "primary": primary}
+                if enabled is True:
+                    op["enabled"] = True
+                    
+                    if position and relative_to:
+                        # Usually another display of this macro, already resolved
+                        relative_physical = physical_names.get(relative_to) or mapper.get_display(relative_to)
+                        if relative_physical:
+                            op["position"] = position
+                            op["relative_to"] = relative_physical
+                
+                # The primary display goes first so the others can be placed around it
+                if primary:
+                    display_ops.insert(0, op)
+                else:
+                    display_ops.append(op)
+            
+            if display_ops:
+                return display_manager.apply_batch(display_ops)
+            return True
+        
+        def _do_audio() -> bool:
+            audio_config = macro_config.get("audio", {})
+            output_name = audio_config.get("output")
+            volume = audio_config.get("volume")
+            if not output_name:
+                return True
+            
+            physical_output = mapper.get_audio_output(output_name)
+            if not physical_output:
+                logger.warning(f"Audio output '{output_name}' not found in mappings")
+                return True
+            
+            current = audio_manager.get_device(physical_output, 'outputs')
+            if current and current.get('default'):
+                logger.debug(f"Audio output {physical_output} is already the default")
+                if volume is None:
+                    return True
+                return audio_manager.set_volume(physical_output, volume)
+            
+            # Switch output and set its volume with a single shell invocation
+            return audio_manager.apply_audio_profile(sink_name=physical_output, volume=volume)
+        
+        # Displays and audio don't depend on each other, so run them side by side
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            display_future = executor.submit(_do_displays)
+            audio_future = executor.submit(_do_audio)
+            display_ok = display_future.result()
+            audio_ok = audio_future.result()
+        success = display_ok and audio_ok
+        
+        if success:
+            logger.info(f"{label[:1].upper()}{label[1:]} applied successfully")
+        else:
+            logger.warning(f"Some operations failed when applying {label}")
+        
+        return success
+    
+    except (OSError, KeyError, TypeError, ValueError) as e:
+        # Malformed macro settings or failing I/O; anything else is a bug
+        # and propagates with its traceback
+        logger.error(f"Error applying {label}: {e}")
+        return False
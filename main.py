@@ -5,23 +5,34 @@ Provides command-line interface for applying macros and managing devices.
 """
 import os
 import sys
-import argparse
-import json
-from typing import Dict, List, Optional, Any
+import time
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
 
-from core.display import DisplayManager
-from core.audio import AudioManager
-from core.detection import get_device_info, save_detected_devices
-from config.devices import DeviceMapper
-from config.settings import load_config, save_config, update_config
-from config.profiles import list_profiles, create_profile, get_profile, delete_profile, apply_profile, build_profile_from_detected_devices
+from config.settings import load_config, update_config, get_cache_dir, atomic_write_bytes
 from utils.logger import logger, set_verbose
-from utils.shell import check_dependency
+from utils import jsonio
+from utils.shell import find_commands, invalidate_command_cache, report_missing_dependency
 
-# Import macros
-from macros.desk_mode import apply_desk_mode
-from macros.tv_mode import apply_tv_mode
-from macros.dual_mode import apply_dual_mode
+if TYPE_CHECKING:
+    import argparse
+
+# Macro names on the command line and their keys in the configuration
+MACRO_TABLE = {
+    "desk": "desk_mode",
+    "tv": "tv_mode",
+    "dual": "dual_mode"
+}
+
+def _write_stdout(data: bytes) -> None:
+    """Write encoded output straight to stdout, after anything already printed."""
+    sys.stdout.flush()
+    sys.stdout.buffer.write(data)
+    sys.stdout.buffer.flush()
+
+def _print_json(obj: Any) -> None:
+    """Print an object as indented JSON without decoding it to a str first."""
+    _write_stdout(jsonio.dumps(obj) + b"\n")
 
 def check_dependencies() -> bool:
     """
@@ -42,46 +53,95 @@ def check_dependencies() -> bool:
     
     all_met = True
     
+    # Look all commands up in a single pass over PATH
+    present = find_commands([cmd for cmd, _ in dependencies + audio_deps])
+    
     for cmd, pkg in dependencies:
-        if not check_dependency(cmd, pkg):
+        if cmd not in present:
+            report_missing_dependency(cmd, pkg)
             all_met = False
     
     # Check if at least one audio system is available
-    audio_met = False
-    for cmd, pkg in audio_deps:
-        if check_dependency(cmd, pkg):
-            audio_met = True
-            break
+    audio_met = any(cmd in present for cmd, _ in audio_deps)
     
     if not audio_met:
+        for cmd, pkg in audio_deps:
+            report_missing_dependency(cmd, pkg)
         logger.error("No supported audio system found.")
         logger.error("Please install either pulseaudio-utils or wireplumber.")
         all_met = False
     
     return all_met
 
+# Created after the dependency check passes, so later runs can skip it. It
+# holds the PATH the check ran with and expires after DEPS_CHECK_TTL seconds.
+DEPS_MARKER = os.path.join(get_cache_dir(), "deps.ok")
+DEPS_CHECK_TTL = 24 * 60 * 60
+
+def check_dependencies_cached(recheck: bool = False) -> bool:
+    """
+    Check dependencies unless a recent run already found them all.
+    
+    A previous result is only reused if it is less than DEPS_CHECK_TTL
+    seconds old and PATH hasn't changed since.
+    
+    Args:
+        recheck: If True, ignore the result of previous runs
+        
+    Returns:
+        True if all dependencies are met, False otherwise
+    """
+    path = os.environ.get("PATH", "").encode()
+    if recheck:
+        invalidate_command_cache()
+    else:
+        try:
+            with open(DEPS_MARKER, 'rb') as f:
+                fresh = time.time() - os.fstat(f.fileno()).st_mtime < DEPS_CHECK_TTL
+                if fresh and f.read() == path:
+                    return True
+        except OSError:
+            pass
+    
+    if not check_dependencies():
+        invalidate_dependency_check()
+        return False
+    
+    try:
+        atomic_write_bytes(DEPS_MARKER, path)
+    except OSError as e:
+        logger.debug(f"Could not record dependency check: {e}")
+    return True
+
+def invalidate_dependency_check() -> None:
+    """Make the next run check dependencies again."""
+    try:
+        os.remove(DEPS_MARKER)
+    except OSError:
+        pass
+
 def detect_command(args) -> None:
     """Handle the 'detect' command."""
+    from core.detection import get_device_info, save_detected_devices
+    
     if args.save:
         save_detected_devices(args.save)
     else:
-        devices = get_device_info()
-        print(json.dumps(devices, indent=2))
+        devices = get_device_info(probe=True)
+        _print_json(devices)
 
 def apply_command(args) -> None:
     """Handle the 'apply' command."""
     if args.profile:
         # Apply a saved profile
+        from config.profiles import apply_profile
         result = apply_profile(args.profile)
         if not result:
             logger.error(f"Failed to apply profile: {args.profile}")
             sys.exit(1)
-    elif args.macro == "desk":
-        result = apply_desk_mode()
-    elif args.macro == "tv":
-        result = apply_tv_mode()
-    elif args.macro == "dual":
-        result = apply_dual_mode()
+    elif args.macro in MACRO_TABLE:
+        from macros.apply import apply_mode
+        result = apply_mode(MACRO_TABLE[args.macro])
     else:
         logger.error(f"Unknown macro: {args.macro}")
         sys.exit(1)
@@ -91,11 +151,13 @@ def apply_command(args) -> None:
 
 def display_command(args) -> None:
     """Handle the 'display' command."""
-    display_mgr = DisplayManager()
+    from core.display import get_display_manager
+    
+    display_mgr = get_display_manager()
     
     if args.list:
-        displays = display_mgr.get_display_info()
-        print(json.dumps(displays, indent=2))
+        displays = display_mgr.get_display_info(probe=args.probe)
+        _print_json(displays)
     elif args.enable:
         result = display_mgr.enable_display(args.enable)
         if not result:
@@ -111,11 +173,13 @@ def display_command(args) -> None:
 
 def audio_command(args) -> None:
     """Handle the 'audio' command."""
-    audio_mgr = AudioManager()
+    from core.audio import get_audio_manager
+    
+    audio_mgr = get_audio_manager()
     
     if args.list:
         audio = audio_mgr.get_audio_info()
-        print(json.dumps(audio, indent=2))
+        _print_json(audio)
     elif args.output:
         result = audio_mgr.set_default_sink(args.output)
         if not result:
@@ -143,24 +207,28 @@ def audio_command(args) -> None:
 def config_command(args) -> None:
     """Handle the 'config' command."""
     if args.show:
-        config = load_config()
-        print(json.dumps(config, indent=2))
+        config = load_config(readonly=True)
+        _print_json(config)
     elif args.update:
         try:
-            with open(args.update, 'r') as f:
-                updates = json.load(f)
+            with open(args.update, 'rb') as f:
+                updates = jsonio.loads(f.read())
             update_config(updates)
             logger.info("Configuration updated successfully")
         except Exception as e:
             logger.error(f"Error updating config: {e}")
             sys.exit(1)
     elif args.reset:
-        from config.settings import DEFAULT_CONFIG, DEFAULT_CONFIG_FILE
-        save_config(DEFAULT_CONFIG, DEFAULT_CONFIG_FILE)
+        from config.settings import save_default_config
+        save_default_config()
+        invalidate_dependency_check()
         logger.info("Configuration reset to defaults")
 
 def profile_command(args) -> None:
     """Handle the 'profile' command."""
+    from config.profiles import (list_profiles, create_profile, get_profile, delete_profile,
+                                 build_profile_from_detected_devices)
+    
     if args.list:
         # List available profiles
         profiles = list_profiles()
@@ -174,7 +242,7 @@ def profile_command(args) -> None:
     
     elif args.create:
         # Create a profile based on current device state
-        description = args.description or f"Profile created on {os.popen('date').read().strip()}"
+        description = args.description or f"Profile created on {time.strftime('%Y-%m-%dT%H:%M:%S')}"
         profile_config = build_profile_from_detected_devices(args.create, description)
         
         # Allow the user to specify primary display
@@ -226,98 +294,193 @@ def profile_command(args) -> None:
             logger.error(f"Profile not found: {args.show}")
             sys.exit(1)
         
-        print(json.dumps(profile, indent=2))
+        _print_json(profile)
 
-def main() -> None:
-    """Main entry point."""
-    parser = argparse.ArgumentParser(description="Screen and Audio Manager")
-    parser.add_argument('-v', '--verbose', action='store_true', help="Enable verbose logging")
-    
-    subparsers = parser.add_subparsers(dest='command', help="Command to execute")
-    
-    # Detect command
-    detect_parser = subparsers.add_parser('detect', help="Detect devices")
-    detect_parser.add_argument('-s', '--save', help="Save detection results to file")
-    
-    # Apply command
-    apply_parser = subparsers.add_parser('apply', help="Apply a macro or profile")
-    apply_group = apply_parser.add_mutually_exclusive_group(required=True)
-    apply_group.add_argument('macro', nargs='?', choices=['desk', 'tv', 'dual'], 
+def warmup_command(args) -> None:
+    """Handle the 'warmup' command."""
+    # Refresh the dependency marker even if it is still valid
+    if not check_dependencies_cached(recheck=True):
+        sys.exit(1)
+    logger.info("Saved dependency check for the next runs")
+
+def _add_detect_arguments(parser: "argparse.ArgumentParser") -> None:
+    """Add the arguments of the 'detect' command."""
+    parser.add_argument('-s', '--save', help="Save detection results to file")
+
+def _add_apply_arguments(parser: "argparse.ArgumentParser") -> None:
+    """Add the arguments of the 'apply' command."""
+    apply_group = parser.add_mutually_exclusive_group(required=True)
+    apply_group.add_argument('macro', nargs='?', choices=list(MACRO_TABLE), 
                              help="Macro to apply")
     apply_group.add_argument('-p', '--profile', help="Profile to apply")
-    
-    # Display command
-    display_parser = subparsers.add_parser('display', help="Manage displays")
-    display_group = display_parser.add_mutually_exclusive_group(required=True)
-    display_group.add_argument('-l', '--list', action='store_true', help="List displays")
-    display_group.add_argument('-e', '--enable', help="Enable display")
-    display_group.add_argument('-d', '--disable', help="Disable display")
-    display_group.add_argument('-p', '--primary', help="Set primary display")
-    
-    # Audio command
-    audio_parser = subparsers.add_parser('audio', help="Manage audio devices")
-    audio_group = audio_parser.add_mutually_exclusive_group(required=True)
-    audio_group.add_argument('-l', '--list', action='store_true', help="List audio devices")
-    audio_group.add_argument('-o', '--output', help="Set default output device")
-    audio_group.add_argument('-i', '--input', help="Set default input device")
-    audio_group.add_argument('--volume', type=int, help="Set volume (0-100)")
-    audio_group.add_argument('--mute', action='store_true', help="Mute device")
-    audio_group.add_argument('--unmute', action='store_true', help="Unmute device")
-    audio_parser.add_argument('--device', help="Device to apply volume/mute to")
-    
-    # Config command
-    config_parser = subparsers.add_parser('config', help="Manage configuration")
-    config_group = config_parser.add_mutually_exclusive_group(required=True)
-    config_group.add_argument('-s', '--show', action='store_true', help="Show current config")
-    config_group.add_argument('-u', '--update', help="Update config from JSON file")
-    config_group.add_argument('-r', '--reset', action='store_true', help="Reset to default config")
-    
-    # Profile command
-    profile_parser = subparsers.add_parser('profile', help="Manage profiles")
-    profile_group = profile_parser.add_mutually_exclusive_group(required=True)
+
+def _add_display_arguments(parser: "argparse.ArgumentParser") -> None:
+    """Add the arguments of the 'display' command."""
+    parser.add_argument('-l', '--list', action='store_true', help="List displays")
+    parser.add_argument('-e', '--enable', help="Enable display")
+    parser.add_argument('-d', '--disable', help="Disable display")
+    parser.add_argument('-p', '--primary', help="Set primary display")
+    parser.add_argument('--probe', action='store_true',
+                        help="With --list, probe the display hardware instead of reading the current state")
+
+def _add_audio_arguments(parser: "argparse.ArgumentParser") -> None:
+    """Add the arguments of the 'audio' command."""
+    parser.add_argument('-l', '--list', action='store_true', help="List audio devices")
+    parser.add_argument('-o', '--output', help="Set default output device")
+    parser.add_argument('-i', '--input', help="Set default input device")
+    parser.add_argument('--volume', type=int, help="Set volume (0-100)")
+    parser.add_argument('--mute', action='store_true', help="Mute device")
+    parser.add_argument('--unmute', action='store_true', help="Unmute device")
+    parser.add_argument('--device', help="Device to apply volume/mute to")
+
+def _add_config_arguments(parser: "argparse.ArgumentParser") -> None:
+    """Add the arguments of the 'config' command."""
+    parser.add_argument('-s', '--show', action='store_true', help="Show current config")
+    parser.add_argument('-u', '--update', help="Update config from JSON file")
+    parser.add_argument('-r', '--reset', action='store_true', help="Reset to default config")
+
+def _add_warmup_arguments(parser: "argparse.ArgumentParser") -> None:
+    """Add the arguments of the 'warmup' command (it has none)."""
+
+def _add_profile_arguments(parser: "argparse.ArgumentParser") -> None:
+    """Add the arguments of the 'profile' command."""
+    profile_group = parser.add_mutually_exclusive_group(required=True)
     profile_group.add_argument('-l', '--list', action='store_true', help="List available profiles")
     profile_group.add_argument('-c', '--create', help="Create a new profile with the given name")
     profile_group.add_argument('-d', '--delete', help="Delete a profile")
     profile_group.add_argument('-s', '--show', help="Show profile configuration")
     
     # Profile creation options
-    profile_parser.add_argument('--description', help="Description for the new profile")
-    profile_parser.add_argument('--primary-display', help="Set primary display for the profile")
-    profile_parser.add_argument('--enable-displays', help="Comma-separated list of displays to enable")
-    profile_parser.add_argument('--audio-output', help="Set default audio output for the profile")
-    profile_parser.add_argument('--audio-input', help="Set default audio input for the profile")
-    profile_parser.add_argument('--volume', type=int, help="Set volume level for the profile (0-100)")
+    parser.add_argument('--description', help="Description for the new profile")
+    parser.add_argument('--primary-display', help="Set primary display for the profile")
+    parser.add_argument('--enable-displays', help="Comma-separated list of displays to enable")
+    parser.add_argument('--audio-output', help="Set default audio output for the profile")
+    parser.add_argument('--audio-input', help="Set default audio input for the profile")
+    parser.add_argument('--volume', type=int, help="Set volume level for the profile (0-100)")
+
+# Subcommands: name -> (help text, function adding the subcommand's arguments, handler)
+COMMAND_TABLE = {
+    "detect": ("Detect devices", _add_detect_arguments, detect_command),
+    "apply": ("Apply a macro or profile", _add_apply_arguments, apply_command),
+    "display": ("Manage displays", _add_display_arguments, display_command),
+    "audio": ("Manage audio devices", _add_audio_arguments, audio_command),
+    "config": ("Manage configuration", _add_config_arguments, config_command),
+    "profile": ("Manage profiles", _add_profile_arguments, profile_command),
+    "warmup": ("Re-check dependencies so the next runs can skip the check", _add_warmup_arguments, warmup_command)
+}
+
+# Options of which exactly one must be given, per subcommand. Checked after
+# parsing instead of with argparse's mutually exclusive groups.
+EXCLUSIVE_OPTIONS = {
+    "display": ("list", "enable", "disable", "primary"),
+    "audio": ("list", "output", "input", "volume", "mute", "unmute"),
+    "config": ("show", "update", "reset")
+}
+
+def _require_exactly_one(parser: "argparse.ArgumentParser", args: "argparse.Namespace") -> None:
+    """
+    Exit with a usage error unless exactly one of the command's exclusive
+    options was given.
+    
+    Args:
+        parser: Parser used to report the error
+        args: Parsed arguments
+    """
+    dests = EXCLUSIVE_OPTIONS.get(args.command)
+    if not dests:
+        return
+    
+    # Flags default to False and options to None; 0 is a valid volume
+    given = [dest for dest in dests
+             if getattr(args, dest) is not None and getattr(args, dest) is not False]
+    if len(given) != 1:
+        options = ", ".join(f"--{dest}" for dest in dests)
+        parser.error(f"{args.command}: exactly one of {options} is required")
+
+def build_parser(command: Optional[str] = None) -> "argparse.ArgumentParser":
+    """
+    Build the command line parser.
+    
+    When a command is given only its subparser is created; otherwise all
+    subcommands are set up so they show up in the help.
+    
+    Args:
+        command: Subcommand to set up (None for all of them)
+        
+    Returns:
+        Argument parser
+    """
+    import argparse
     
-    args = parser.parse_args()
+    parser = argparse.ArgumentParser(description="Screen and Audio Manager")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Enable verbose logging")
+    parser.add_argument('--recheck-deps', action='store_true',
+                        help="Check dependencies even if a previous run found them")
+    
+    subparsers = parser.add_subparsers(dest='command', help="Command to execute")
+    for name, (help_text, add_arguments, _) in COMMAND_TABLE.items():
+        if command is None or command == name:
+            add_arguments(subparsers.add_parser(name, help=help_text))
+    
+    return parser
+
+def _fast_parse(argv: List[str]) -> Optional[SimpleNamespace]:
+    """
+    Parse 'apply <macro>', the invocation bound to keyboard shortcuts,
+    without setting up argparse.
+    
+    Args:
+        argv: Command line arguments without the program name
+        
+    Returns:
+        Parsed arguments, or None if argparse has to handle the command line
+    """
+    verbose = recheck_deps = False
+    i = 0
+    while i < len(argv) and argv[i] in ('-v', '--verbose', '--recheck-deps'):
+        if argv[i] == '--recheck-deps':
+            recheck_deps = True
+        else:
+            verbose = True
+        i += 1
+    
+    if argv[i:i + 1] != ['apply'] or len(argv) != i + 2 or argv[i + 1] not in MACRO_TABLE:
+        return None
+    
+    return SimpleNamespace(command='apply', macro=argv[i + 1], profile=None,
+                           verbose=verbose, recheck_deps=recheck_deps)
+
+def main() -> None:
+    """Main entry point."""
+    args = _fast_parse(sys.argv[1:])
+    if args is None:
+        # Find the subcommand first so only its parser needs to be set up; the
+        # top-level options take no values, so it is the first non-option argument
+        command = next((arg for arg in sys.argv[1:] if not arg.startswith('-')), None)
+        
+        parser = build_parser(command if command in COMMAND_TABLE else None)
+        args = parser.parse_args()
+        
+        # Check if no command was provided
+        if not args.command:
+            parser.print_help()
+            sys.exit(1)
+        
+        _require_exactly_one(parser, args)
     
     # Set up logging
     if args.verbose:
         set_verbose(True)
     
-    # Check if no command was provided
-    if not args.command:
-        parser.print_help()
-        sys.exit(1)
-    
-    # Check dependencies
-    if not check_dependencies():
+    # Check dependencies (only until they have been found once)
+    if not check_dependencies_cached(args.recheck_deps):
         logger.error("Missing required dependencies")
         sys.exit(1)
     
     # Handle commands
     try:
-        if args.command == 'detect':
-            detect_command(args)
-        elif args.command == 'apply':
-            apply_command(args)
-        elif args.command == 'display':
-            display_command(args)
-        elif args.command == 'audio':
-            audio_command(args)
-        elif args.command == 'config':
-            config_command(args)
-        elif args.command == 'profile':
-            profile_command(args)
+        handler = COMMAND_TABLE[args.command][2]
+        handler(args)
     except KeyboardInterrupt:
         logger.info("Operation cancelled by user")
         sys.exit(130)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for parsing xrandr output and skipping display changes already in effect.
+"""
+import unittest
+from unittest import mock
+
+import core.detection as detection
+from core.display import DisplayManager
+from utils.shell import CommandResult
+
+XRANDR_OUTPUT = """Screen 0: minimum 320 x 200, current 3840 x 1080, maximum 16384 x 16384
+DP-1 connected primary 1920x1080+0+0 (normal left inverted right x axis y axis) 527mm x 296mm
+   1920x1080_60.00  60.00*+
+   1280x720      60.00
+HDMI-1 connected 1920x1080+1920+0 (normal left inverted right x axis y axis) 1600mm x 900mm
+   1920x1080i    60.00*+  50.00
+   1280x720      60.00
+HDMI-2 connected (normal left inverted right x axis y axis)
+   1920x1080     60.00 +
+DP-2 disconnected (normal left inverted right x axis y axis)
+"""
+
+class DetectDisplaysTest(unittest.TestCase):
+    """Tests for _detect_displays."""
+    
+    def setUp(self):
+        patcher = mock.patch.object(detection, "run_command",
+                                    return_value=CommandResult(0, XRANDR_OUTPUT, ""))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.displays = {d['name']: d for d in detection._detect_displays()}
+    
+    def test_mode_name_suffixes(self):
+        self.assertEqual(self.displays['DP-1']['current_resolution'], "1920x1080")
+        self.assertEqual(self.displays['HDMI-1']['current_resolution'], "1920x1080")
+    
+    def test_inactive_and_disconnected(self):
+        self.assertTrue(self.displays['DP-1']['active'])
+        self.assertTrue(self.displays['HDMI-1']['active'])
+        self.assertFalse(self.displays['HDMI-2']['active'])
+        self.assertIsNone(self.displays['HDMI-2']['current_resolution'])
+        self.assertNotIn('DP-2', self.displays)
+    
+    def test_primary(self):
+        self.assertTrue(self.displays['DP-1']['primary'])
+        self.assertFalse(self.displays['HDMI-1']['primary'])
+
+class IsAppliedTest(unittest.TestCase):
+    """Tests for DisplayManager._is_applied."""
+    
+    def test_off_only_skipped_when_known_off(self):
+        off = {"name": "HDMI-1", "enabled": False}
+        self.assertTrue(DisplayManager._is_applied({'active': False, 'current_resolution': None}, off))
+        self.assertFalse(DisplayManager._is_applied({'active': True, 'current_resolution': None}, off))
+        self.assertFalse(DisplayManager._is_applied({'current_resolution': None}, off))
+    
+    def test_enable_needs_known_active(self):
+        on = {"name": "DP-1", "enabled": True}
+        self.assertTrue(DisplayManager._is_applied({'active': True, 'current_resolution': "1920x1080"}, on))
+        self.assertFalse(DisplayManager._is_applied({'active': False, 'current_resolution': None}, on))
+        self.assertFalse(DisplayManager._is_applied({'current_resolution': "1920x1080"}, on))
+
+if __name__ == "__main__":
+    unittest.main()
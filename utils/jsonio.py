@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+JSON serialization helpers using orjson when available.
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Parse JSON data.
+    
+    Args:
+        data: JSON document as bytes or str
+        
+    Returns:
+        Parsed Python object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize an object to indented JSON.
+    
+    Args:
+        obj: Object to serialize
+        
+    Returns:
+        UTF-8 encoded JSON with two-space indentation
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
@@ -1,41 +1,123 @@
 #!/usr/bin/env python3
 """
 Logging configuration module.
+
+The logging package is imported and the handlers are set up the first time
+the logger is used, so commands that never log (like --help) skip that work.
 """
 import os
-import logging
 import sys
-from datetime import datetime
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional
 
-# Create a custom logger
-logger = logging.getLogger("screen-audio-manager")
+if TYPE_CHECKING:
+    import logging
 
-# Set the default level
-logger.setLevel(logging.INFO)
+# Directory for the dated log files
+LOG_DIR = os.path.expanduser("~/.local/share/screen-audio-manager/logs")
 
-# Create handlers
-c_handler = logging.StreamHandler(sys.stdout)
-log_dir = os.path.expanduser("~/.local/share/screen-audio-manager/logs")
+# Console and file record formats
+CONSOLE_FORMAT = '%(levelname)s: %(message)s'
+FILE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
-# Create log directory if it doesn't exist
-os.makedirs(log_dir, exist_ok=True)
+# The configured logger, once set up
+_logger: Optional["logging.Logger"] = None
+# Serializes the setup, so threads that log first at the same time don't
+# both add handlers to the shared logger
+_setup_lock = threading.Lock()
 
-# Create a log file with date in the name
-log_file = os.path.join(log_dir, f"manager_{datetime.now().strftime('%Y-%m-%d')}.log")
-f_handler = logging.FileHandler(log_file)
+def _setup() -> "logging.Logger":
+    """
+    Create and configure the application logger.
+    
+    Returns:
+        Configured logger
+    """
+    import logging
+    
+    class DatedFileHandler(logging.FileHandler):
+        """
+        File handler writing to a log file named after the day of each record.
+        
+        The directory is created and the file opened on the first record, so
+        runs that log nothing never touch the disk. A process that keeps
+        running past midnight moves on to the next day's file.
+        """
+        
+        def __init__(self, directory: str):
+            """
+            Initialize the handler without opening the file.
+            
+            Args:
+                directory: Directory for the log files
+            """
+            self.directory = directory
+            super().__init__(self._dated_path(time.time()), delay=True)
+        
+        def _dated_path(self, timestamp: float) -> str:
+            """Get the log file path for the day of a timestamp."""
+            day = time.strftime('%Y-%m-%d', time.localtime(timestamp))
+            return os.path.join(self.directory, f"manager_{day}.log")
+        
+        def emit(self, record: logging.LogRecord) -> None:
+            """Switch to the record's daily file if needed, then write it."""
+            path = self._dated_path(record.created)
+            if path != self.baseFilename:
+                if self.stream is not None:
+                    self.stream.close()
+                    self.stream = None
+                self.baseFilename = path
+            super().emit(record)
+        
+        def _open(self):
+            """Create the log directory, then open the file."""
+            os.makedirs(self.directory, exist_ok=True)
+            return super()._open()
+    
+    # Create a custom logger
+    new_logger = logging.getLogger("screen-audio-manager")
+    
+    # Create handlers; the log files have the date in their name
+    c_handler = logging.StreamHandler(sys.stdout)
+    f_handler = DatedFileHandler(LOG_DIR)
+    
+    # Create formatters and add them to handlers
+    c_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    f_handler.setFormatter(logging.Formatter(FILE_FORMAT))
+    
+    # Add handlers to the logger
+    new_logger.addHandler(c_handler)
+    new_logger.addHandler(f_handler)
+    
+    # Set a higher logging level for debugging
+    new_logger.setLevel(logging.DEBUG)
+    return new_logger
 
-# Create formatters and add them to handlers
-c_format = logging.Formatter('%(levelname)s: %(message)s')
-f_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-c_handler.setFormatter(c_format)
-f_handler.setFormatter(f_format)
+def get_logger() -> "logging.Logger":
+    """
+    Get the application logger, setting it up on first use.
+    
+    Returns:
+        Configured logger
+    """
+    global _logger
+    if _logger is None:
+        with _setup_lock:
+            if _logger is None:
+                _logger = _setup()
+    return _logger
 
-# Add handlers to the logger
-logger.addHandler(c_handler)
-logger.addHandler(f_handler)
+class _LazyLogger:
+    """Stand-in for the logger that sets it up when it is first used."""
+    
+    __slots__ = ()
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_logger(), name)
 
-# Set a higher logging level for debugging
-logger.setLevel(logging.DEBUG)
+# Shared logger; importing it doesn't set up logging yet
+logger = _LazyLogger()
 
 def set_verbose(verbose: bool = True) -> None:
     """
@@ -44,6 +126,8 @@ def set_verbose(verbose: bool = True) -> None:
     Args:
         verbose: If True, set level to DEBUG, otherwise INFO
     """
+    import logging
+    
     logger.setLevel(logging.DEBUG if verbose else logging.INFO)
     logger.debug("Debug logging enabled")
 
@@ -2,13 +2,22 @@
 """
 Utilities for running shell commands and processing their output.
 """
+import os
+import shlex
 import subprocess
-from typing import Optional, Union, List
+from typing import Dict, Iterator, Optional, Set, Union, List
 from dataclasses import dataclass
 
+# Shell for commands run with shell=True; dash starts much faster than bash,
+# which /bin/sh points to on some distributions
+SHELL = "/bin/dash" if os.path.exists("/bin/dash") else "/bin/sh"
+
 @dataclass
 class CommandResult:
     """Stores the result of a command execution."""
+    # Declared by hand rather than with dataclass(slots=True), which needs 3.10
+    __slots__ = ("returncode", "stdout", "stderr")
+    
     returncode: int
     stdout: str
     stderr: str
@@ -20,22 +29,34 @@ class CommandResult:
 
 def run_command(command: Union[str, List[str]], 
                 timeout: Optional[int] = 30,
-                shell: bool = True) -> CommandResult:
+                shell: bool = False,
+                strip: bool = True) -> CommandResult:
     """
-    Run a shell command and return its output.
+    Run a command and return its output.
     
     Args:
         command: Command to run as string or list of arguments
         timeout: Timeout in seconds (None for no timeout)
-        shell: Whether to run the command through the shell
+        shell: Whether to run a string command through the shell. Otherwise
+               strings are split like a shell would and run directly, as
+               are argument lists.
+        strip: Whether to strip surrounding whitespace from stdout. Callers
+               that parse large outputs line by line can skip the copy.
         
     Returns:
         CommandResult object with return code, stdout, and stderr
     """
+    if not isinstance(command, str):
+        shell = False
+    
     try:
+        if not shell and isinstance(command, str):
+            command = shlex.split(command)
+        
         process = subprocess.run(
             command,
             shell=shell,
+            executable=SHELL if shell else None,
             capture_output=True,
             text=True,
             timeout=timeout
@@ -43,7 +64,7 @@ def run_command(command: Union[str, List[str]],
         
         return CommandResult(
             returncode=process.returncode,
-            stdout=process.stdout.strip(),
+            stdout=process.stdout.strip() if strip else process.stdout,
             stderr=process.stderr.strip()
         )
     except subprocess.TimeoutExpired:
@@ -59,6 +80,95 @@ def run_command(command: Union[str, List[str]],
             stderr=f"Error executing command: {str(e)}"
         )
 
+def run_command_chain(commands: List[List[str]],
+                      timeout: Optional[int] = 30) -> CommandResult:
+    """
+    Run several commands in a single shell invocation.
+    
+    The commands are quoted and joined with '&&', so execution stops at
+    the first command that fails.
+    
+    Args:
+        commands: List of commands, each given as a list of arguments
+        timeout: Timeout in seconds for the whole chain (None for no timeout)
+        
+    Returns:
+        CommandResult object for the chain as a whole
+    """
+    script = " && ".join(" ".join(shlex.quote(arg) for arg in cmd) for cmd in commands)
+    return run_command(script, timeout=timeout, shell=True)
+
+def run_commands_parallel(commands: List[List[str]],
+                          timeout: Optional[int] = 30,
+                          strip: bool = True) -> Iterator[CommandResult]:
+    """
+    Start several commands at once and yield their results in order.
+    
+    All commands run concurrently, so waiting for later results costs
+    little extra once the earlier ones are done. Closing the generator
+    early kills any command that is still running.
+    
+    Args:
+        commands: List of commands, each given as a list of arguments
+        timeout: Timeout in seconds for each command (None for no timeout)
+        strip: Whether to strip surrounding whitespace from stdout
+        
+    Yields:
+        CommandResult objects in the same order as the commands
+    """
+    processes = []
+    for command in commands:
+        try:
+            processes.append(subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            ))
+        except Exception as e:
+            processes.append(e)
+    
+    try:
+        for process in processes:
+            if isinstance(process, Exception):
+                yield CommandResult(
+                    returncode=1,
+                    stdout="",
+                    stderr=f"Error executing command: {str(process)}"
+                )
+                continue
+            
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                yield CommandResult(
+                    returncode=124,  # Standard timeout exit code
+                    stdout="",
+                    stderr=f"Command timed out after {timeout} seconds"
+                )
+                continue
+            
+            yield CommandResult(
+                returncode=process.returncode,
+                stdout=stdout.strip() if strip else stdout,
+                stderr=stderr.strip()
+            )
+    finally:
+        for process in processes:
+            if isinstance(process, subprocess.Popen) and process.poll() is None:
+                process.kill()
+                process.communicate()
+
+# Results of command lookups: command -> found, valid for the PATH in _COMMAND_CACHE_PATH
+_COMMAND_CACHE: Dict[str, bool] = {}
+_COMMAND_CACHE_PATH: Optional[str] = None
+
+def invalidate_command_cache() -> None:
+    """Forget earlier command lookups, e.g. after installing packages."""
+    _COMMAND_CACHE.clear()
+
 def check_command_exists(command: str) -> bool:
     """
     Check if a command exists in the system.
@@ -69,8 +179,62 @@ def check_command_exists(command: str) -> bool:
     Returns:
         True if command exists, False otherwise
     """
-    result = run_command(f"which {command}")
-    return result.success
+    return command in find_commands([command])
+
+def find_commands(commands: List[str]) -> Set[str]:
+    """
+    Find which of several commands exist, walking PATH only once.
+    
+    Each directory is probed for just the commands still unknown, which
+    touches far fewer entries than listing the (often large) directories.
+    Results are remembered for the rest of the process while PATH is
+    unchanged, so later checks of the same commands cost no lookups.
+    
+    Args:
+        commands: Command names to look for
+        
+    Returns:
+        Set of the command names that were found
+    """
+    global _COMMAND_CACHE_PATH
+    
+    search_path = os.environ.get("PATH", os.defpath)
+    if search_path != _COMMAND_CACHE_PATH:
+        _COMMAND_CACHE.clear()
+        _COMMAND_CACHE_PATH = search_path
+    
+    missing = {command for command in commands if command not in _COMMAND_CACHE}
+    unknown = set(missing)
+    seen = set()
+    
+    for directory in search_path.split(os.pathsep):
+        if not missing:
+            break
+        # PATH often lists a directory more than once
+        directory = directory or os.curdir
+        if directory in seen:
+            continue
+        seen.add(directory)
+        for command in list(missing):
+            path = os.path.join(directory, command)
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                missing.discard(command)
+    
+    for command in unknown:
+        _COMMAND_CACHE[command] = command not in missing
+    
+    return {command for command in commands if _COMMAND_CACHE[command]}
+
+def report_missing_dependency(command: str, package: str) -> None:
+    """
+    Tell the user how to install a missing dependency.
+    
+    Args:
+        command: Command that was not found
+        package: Package name that provides the command
+    """
+    print(f"Required dependency '{command}' not found.")
+    print(f"Please install it with: sudo pacman -S {package}")
 
 def check_dependency(command: str, package: str) -> bool:
     """
@@ -86,6 +250,5 @@ def check_dependency(command: str, package: str) -> bool:
     if check_command_exists(command):
         return True
     
-    print(f"Required dependency '{command}' not found.")
-    print(f"Please install it with: sudo pacman -S {package}")
+    report_missing_dependency(command, package)
     return False